@@ -5,6 +5,13 @@ class Settings(BaseSettings):
     # Supabase
     supabase_url: str
     supabase_key: str
+    supabase_timeout: float = 10.0
+    supabase_max_connections: int = 100
+    supabase_max_keepalive_connections: int = 20
+    supabase_keepalive_expiry: float = 30.0
+    # In-memory PostgREST stand-in for local runs and load tests
+    supabase_local: bool = False
+    supabase_local_latency_ms: float = 0.0
     
     # Redis
     redis_url: str
@@ -13,9 +20,64 @@ class Settings(BaseSettings):
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    user_cache_ttl: int = 60
+    # Verified-token LRU size (per worker)
+    token_cache_size: int = 10000
+    # Sign role and username into access tokens so authorization skips the profile lookup
+    jwt_embed_claims: bool = False
+    # How often each worker refreshes its copy of the revoked token ids
+    token_revocation_sync_seconds: int = 5
     
    
     post_cache_ttl: int = 300
+    post_list_cache_ttl: int = 300
+    # Stored with each post on write
+    post_excerpt_length: int = 200
+    reading_words_per_minute: int = 200
+    # Post documents are gzip/brotli compressed once, when they are cached
+    post_gzip_level: int = 9
+    post_brotli_quality: int = 9
+    # Cache-Control per endpoint ("public" becomes "private" for signed-in viewers)
+    post_cache_control: str = "public, max-age=60"
+    post_list_cache_control: str = "public, max-age=15"
+    comment_cache_control: str = "public, max-age=5"
+
+    # View counting
+    view_flush_interval_ms: int = 1000
+    view_flush_max_pending: int = 500
+    view_sync_interval: int = 300
+    view_sync_batch_size: int = 1000
+    view_sync_lock_ttl: int = 120
+    # Count unique visitors per post per day with HyperLogLog
+    unique_views_enabled: bool = False
+    unique_views_retention_days: int = 8
+
+    # Reactions: how often queued like/bookmark changes are written to the database
+    reaction_sync_interval: int = 5
+    reaction_sync_batch_size: int = 500
+    reaction_sync_lock_ttl: int = 60
+    # Idle posts' reaction sets leave Redis after this long (refreshed on access)
+    reaction_cache_ttl: int = 86400
+
+    # WebSocket fan-out: per-client outbound queue high-water mark and what
+    # to do when a client reaches it (drop_oldest, coalesce or disconnect)
+    ws_queue_high_water: int = 100
+    ws_slow_consumer_policy: str = "drop_oldest"
+    # Recent events kept per channel for Last-Event-ID replay on reconnect
+    event_stream_max_len: int = 1000
+    event_stream_ttl: int = 86400
+
+    # In-process cache tier in front of Redis (per worker)
+    local_cache_ttl: int = 30
+    local_cache_max_entries: int = 1000
+    local_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # Comments
+    comment_cache_ttl: int = 120
+    comment_order: str = "desc"
+    comment_reply_order: str = "asc"
+    # Default page size for top-level comments and replies
+    comment_page_size: int = 20
     
     class Config:
         env_file = ".env"
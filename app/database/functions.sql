@@ -0,0 +1,84 @@
+-- Database functions called through PostgREST RPC (sb_client.rpc).
+-- app/database/local.py mirrors them for the in-memory stand-in.
+-- Apply the files in migrations/ (in order) first; the functions use their tables.
+
+-- Add drained Redis view deltas to posts.views in one statement.
+-- payload: [{"id": 1, "delta": 42}, ...]
+create or replace function increment_post_views(payload jsonb)
+returns integer
+language sql
+as $$
+  with deltas as (
+    select (item->>'id')::bigint as id, (item->>'delta')::bigint as delta
+    from jsonb_array_elements(payload) as item
+  ),
+  updated as (
+    update posts p
+    set views = coalesce(p.views, 0) + d.delta
+    from deltas d
+    where p.id = d.id
+    returning 1
+  )
+  select count(*)::integer from updated;
+$$;
+
+-- Daily unique-visitor estimates from the Redis HyperLogLogs.
+-- Tables: migrations/001_post_unique_views.sql
+-- payload: [{"id": 1, "day": "2024-01-31", "uniques": 17}, ...]
+create or replace function set_post_daily_unique_views(payload jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  updated integer;
+begin
+  insert into post_daily_unique_views (post_id, day, uniques)
+  select (item->>'id')::bigint, (item->>'day')::date, (item->>'uniques')::bigint
+  from jsonb_array_elements(payload) as item
+  where exists (select 1 from posts where posts.id = (item->>'id')::bigint)
+  on conflict (post_id, day) do update set uniques = excluded.uniques;
+
+  update posts p
+  set unique_views = t.total
+  from (
+    select post_id, sum(uniques) as total
+    from post_daily_unique_views
+    where post_id in (select (item->>'id')::bigint from jsonb_array_elements(payload) as item)
+    group by post_id
+  ) t
+  where p.id = t.post_id;
+  get diagnostics updated = row_count;
+  return updated;
+end;
+$$;
+
+-- Like/bookmark changes queued in Redis, at most one per (user, post, type).
+-- Table: migrations/002_reactions.sql
+-- payload: [{"op": "add", "user_id": "...", "post_id": 1, "type": "like"}, ...]
+create or replace function apply_reactions(payload jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  added integer;
+  removed integer;
+begin
+  insert into reactions (user_id, post_id, type)
+  select r.user_id, r.post_id, r.type
+  from jsonb_array_elements(payload) as item,
+       jsonb_populate_record(null::reactions, item) as r
+  where item->>'op' = 'add'
+    and exists (select 1 from posts where posts.id = r.post_id)
+  on conflict (user_id, post_id, type) do nothing;
+  get diagnostics added = row_count;
+
+  delete from reactions t
+  using jsonb_array_elements(payload) as item,
+        jsonb_populate_record(null::reactions, item) as r
+  where item->>'op' = 'remove'
+    and t.user_id = r.user_id and t.post_id = r.post_id and t.type = r.type;
+  get diagnostics removed = row_count;
+
+  return added + removed;
+end;
+$$;
@@ -0,0 +1,363 @@
+"""In-memory PostgREST/GoTrue stand-in.
+
+Plugged into the async Supabase client as an httpx transport (set
+``SUPABASE_LOCAL=true``), it answers the subset of the PostgREST and GoTrue
+APIs the app uses from plain Python dicts. ``latency_ms`` adds an awaited
+delay per call to model the network round trip, which makes it possible to
+load-test the request path without a real Supabase project.
+"""
+import asyncio
+import json
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import httpx
+
+# table -> primary key columns; tables with an "id" key get a serial id
+SCHEMA: Dict[str, Tuple[str, ...]] = {
+    "posts": ("id",),
+    "comments": ("id",),
+    "categories": ("id",),
+    "profiles": ("user_id",),
+    "post_categories": ("post_id", "category_id"),
+    "post_daily_unique_views": ("post_id", "day"),
+    "reactions": ("user_id", "post_id", "type"),
+}
+
+# (table, embedded table) -> (local column, foreign column) for many-to-one embeds
+FOREIGN_KEYS: Dict[Tuple[str, str], Tuple[str, str]] = {
+    ("posts", "profiles"): ("author_id", "user_id"),
+    ("comments", "profiles"): ("user_id", "user_id"),
+    ("comments", "posts"): ("post_id", "id"),
+    ("post_categories", "categories"): ("category_id", "id"),
+    ("post_categories", "posts"): ("post_id", "id"),
+}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas that are not nested inside parentheses or quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def _coerce(raw: str, sample: Any) -> Any:
+    if raw == "null":
+        return None
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, float):
+        return float(raw)
+    return raw
+
+
+def _compare(operator: str, actual: Any, raw: str) -> bool:
+    if operator == "is":
+        if raw == "null":
+            return actual is None
+        return actual is (raw == "true")
+    if operator == "in":
+        values = [_unquote(v) for v in _split_top_level(raw.strip("()"))]
+        return any(actual == _coerce(v, actual) for v in values)
+    if operator in ("like", "ilike"):
+        if actual is None:
+            return False
+        pattern = "^" + re.escape(raw).replace("\\*", ".*").replace("%", ".*") + "$"
+        flags = re.IGNORECASE if operator == "ilike" else 0
+        return re.match(pattern, str(actual), flags) is not None
+
+    expected = _coerce(raw, actual)
+    if operator == "eq":
+        return actual == expected
+    if operator == "neq":
+        return actual != expected
+    if actual is None or expected is None:
+        return False
+    if operator == "gt":
+        return actual > expected
+    if operator == "gte":
+        return actual >= expected
+    if operator == "lt":
+        return actual < expected
+    if operator == "lte":
+        return actual <= expected
+    raise ValueError(f"Unsupported operator: {operator}")
+
+
+def _parse_condition(expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """Parse "col.op.value", "or(...)" and "and(...)" into a row predicate"""
+    for group in ("or", "and"):
+        if expression.startswith(f"{group}(") and expression.endswith(")"):
+            children = [_parse_condition(e) for e in _split_top_level(expression[len(group) + 1:-1])]
+            combine = any if group == "or" else all
+            return lambda row: combine(child(row) for child in children)
+
+    negate = False
+    column, rest = expression.split(".", 1)
+    if rest.startswith("not."):
+        negate, rest = True, rest[4:]
+    operator, raw = rest.split(".", 1)
+    if operator != "in":
+        raw = _unquote(raw)
+    predicate = lambda row: _compare(operator, row.get(column), raw)
+    return (lambda row: not predicate(row)) if negate else predicate
+
+
+def _increment_post_views(db: "LocalPostgREST", params: Dict[str, Any]) -> int:
+    deltas = {item["id"]: item["delta"] for item in params.get("payload", [])}
+    updated = 0
+    for row in db.table("posts"):
+        if row["id"] in deltas:
+            row["views"] = (row.get("views") or 0) + deltas[row["id"]]
+            updated += 1
+    return updated
+
+
+def _set_post_daily_unique_views(db: "LocalPostgREST", params: Dict[str, Any]) -> int:
+    posts = {row["id"]: row for row in db.table("posts")}
+    daily = db.table("post_daily_unique_views")
+    for item in params.get("payload", []):
+        if item["id"] not in posts:
+            continue
+        existing = next((r for r in daily if r["post_id"] == item["id"] and r["day"] == item["day"]), None)
+        if existing:
+            existing["uniques"] = item["uniques"]
+        else:
+            daily.append({"post_id": item["id"], "day": item["day"], "uniques": item["uniques"]})
+
+    touched = {item["id"] for item in params.get("payload", []) if item["id"] in posts}
+    for post_id in touched:
+        posts[post_id]["unique_views"] = sum(r["uniques"] for r in daily if r["post_id"] == post_id)
+    return len(touched)
+
+
+def _apply_reactions(db: "LocalPostgREST", params: Dict[str, Any]) -> int:
+    posts = {row["id"] for row in db.table("posts")}
+    reactions = db.table("reactions")
+    applied = 0
+    for item in params.get("payload", []):
+        key = (item["user_id"], item["post_id"], item["type"])
+        existing = next((r for r in reactions if (r["user_id"], r["post_id"], r["type"]) == key), None)
+        if item["op"] == "add" and existing is None and item["post_id"] in posts:
+            reactions.append({"user_id": key[0], "post_id": key[1], "type": key[2], "created_at": _now()})
+            applied += 1
+        elif item["op"] == "remove" and existing is not None:
+            reactions.remove(existing)
+            applied += 1
+    return applied
+
+
+# Python equivalents of the SQL functions in functions.sql
+FUNCTIONS: Dict[str, Callable[["LocalPostgREST", Dict[str, Any]], Any]] = {
+    "increment_post_views": _increment_post_views,
+    "set_post_daily_unique_views": _set_post_daily_unique_views,
+    "apply_reactions": _apply_reactions,
+}
+
+
+class LocalPostgREST(httpx.AsyncBaseTransport):
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: [] for name in SCHEMA}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.functions: Dict[str, Callable[["LocalPostgREST", Dict[str, Any]], Any]] = dict(FUNCTIONS)
+        self._serials: Dict[str, int] = {}
+
+    def register_rpc(self, name: str, function: Callable[["LocalPostgREST", Dict[str, Any]], Any]):
+        self.functions[name] = function
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = request.url.path
+        params = parse_qsl(request.url.query.decode(), keep_blank_values=True)
+        body = json.loads(request.content) if request.content else None
+
+        try:
+            if path.startswith("/auth/v1/"):
+                return self._auth(path[len("/auth/v1/"):], dict(params), body or {})
+            if path.startswith("/rest/v1/rpc/"):
+                name = path[len("/rest/v1/rpc/"):]
+                if name not in self.functions:
+                    return self._error(404, "PGRST202", f"Could not find the function {name}")
+                return self._json(200, self.functions[name](self, body or {}))
+            if path.startswith("/rest/v1/"):
+                return self._rest(request, path[len("/rest/v1/"):], params, body)
+        except (ValueError, KeyError) as e:
+            return self._error(400, "PGRST100", str(e))
+        return self._error(404, "PGRST000", f"Unknown path {path}")
+
+    # PostgREST
+    def table(self, name: str) -> List[Dict[str, Any]]:
+        return self.tables.setdefault(name, [])
+
+    def _rest(self, request: httpx.Request, name: str, params: List[Tuple[str, str]], body: Any) -> httpx.Response:
+        rows = self.table(name)
+        prefer = request.headers.get("prefer", "")
+        wants_object = "vnd.pgrst.object" in request.headers.get("accept", "")
+        conditions = [
+            _parse_condition(f"{key}({value[1:-1]})" if key in ("or", "and") else f"{key}.{value}")
+            for key, value in params if key not in RESERVED_PARAMS
+        ]
+        options = dict(params)
+        matches = lambda row: all(condition(row) for condition in conditions)
+
+        if request.method == "GET":
+            result = [row for row in rows if matches(row)]
+            total = len(result)
+            result = self._order(result, options.get("order"))
+            offset = int(options.get("offset", 0))
+            limit = options.get("limit")
+            result = result[offset:offset + int(limit)] if limit is not None else result[offset:]
+        elif request.method == "POST":
+            result = self._insert(name, body if isinstance(body, list) else [body], prefer, options.get("on_conflict"))
+            total = len(result)
+        elif request.method == "PATCH":
+            result = [row for row in rows if matches(row)]
+            for row in result:
+                row.update(body or {})
+            total = len(result)
+        elif request.method == "DELETE":
+            result = [row for row in rows if matches(row)]
+            self.tables[name] = [row for row in rows if not matches(row)]
+            total = len(result)
+        else:
+            return self._error(405, "PGRST000", f"Unsupported method {request.method}")
+
+        result = [self._project(name, row, options.get("select", "*")) for row in result]
+        headers = {"content-range": f"0-{max(len(result) - 1, 0)}/{total if 'count=exact' in prefer else '*'}"}
+        if request.method != "GET" and "return=minimal" in prefer:
+            return httpx.Response(201 if request.method == "POST" else 204, headers=headers)
+        if wants_object:
+            if len(result) != 1:
+                return self._error(
+                    406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                    details=f"The result contains {len(result)} rows",
+                )
+            return self._json(200, result[0], headers)
+        return self._json(201 if request.method == "POST" else 200, result, headers)
+
+    def _insert(self, name: str, new_rows: List[Dict[str, Any]], prefer: str, on_conflict: Optional[str]) -> List[Dict[str, Any]]:
+        rows = self.table(name)
+        keys = tuple(on_conflict.split(",")) if on_conflict else SCHEMA.get(name, ("id",))
+        inserted = []
+        for data in new_rows:
+            row = dict(data)
+            if keys == ("id",) and "id" not in row:
+                self._serials[name] = self._serials.get(name, 0) + 1
+                row["id"] = self._serials[name]
+            row.setdefault("created_at", _now())
+            if name in ("posts", "comments", "profiles"):
+                row.setdefault("updated_at", row["created_at"])
+
+            existing = next((r for r in rows if all(r.get(k) == row.get(k) for k in keys)), None)
+            if existing is not None:
+                if "resolution=merge-duplicates" in prefer:
+                    existing.update(data)
+                    inserted.append(existing)
+                    continue
+                if "resolution=ignore-duplicates" in prefer:
+                    continue
+                raise ValueError(f"duplicate key value violates unique constraint on {name}")
+            rows.append(row)
+            inserted.append(row)
+        return inserted
+
+    @staticmethod
+    def _order(rows: List[Dict[str, Any]], order: Optional[str]) -> List[Dict[str, Any]]:
+        if not order:
+            return rows
+        for clause in reversed(order.split(",")):
+            column, _, direction = clause.partition(".")
+            descending = direction.startswith("desc")
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=descending)
+            rows = present + missing if not descending else missing + present
+        return rows
+
+    def _project(self, name: str, row: Dict[str, Any], select: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for field in _split_top_level(select):
+            if field == "*":
+                result.update(row)
+            elif "(" in field:
+                embedded, columns = field[:-1].split("(", 1)
+                alias, _, embedded = embedded.rpartition(":")
+                local, foreign = FOREIGN_KEYS[(name, embedded)]
+                target = next((r for r in self.table(embedded) if r.get(foreign) == row.get(local)), None)
+                result[alias or embedded] = self._project(embedded, target, columns) if target else None
+            else:
+                alias, _, column = field.rpartition(":")
+                result[alias or column] = row.get(column)
+        return result
+
+    # GoTrue
+    def _auth(self, endpoint: str, params: Dict[str, str], body: Dict[str, Any]) -> httpx.Response:
+        if endpoint == "signup":
+            if any(u["email"] == body.get("email") for u in self.users.values()):
+                return self._json(422, {"code": 422, "msg": "User already registered"})
+            user = {
+                "id": str(uuid.uuid4()),
+                "email": body.get("email"),
+                "role": "authenticated",
+                "created_at": _now(),
+                "user_metadata": body.get("data") or {},
+            }
+            self.users[user["id"]] = {**user, "password": body.get("password")}
+            return self._json(200, {"access_token": uuid.uuid4().hex, "token_type": "bearer", "user": user})
+
+        if endpoint == "token" and params.get("grant_type") == "password":
+            for user in self.users.values():
+                if user["email"] == body.get("email") and user["password"] == body.get("password"):
+                    public = {k: v for k, v in user.items() if k != "password"}
+                    return self._json(200, {"access_token": uuid.uuid4().hex, "token_type": "bearer", "user": public})
+            return self._json(400, {"error": "invalid_grant", "error_description": "Invalid login credentials"})
+
+        return self._json(404, {"msg": f"Unknown auth endpoint {endpoint}"})
+
+    # Helpers
+    @staticmethod
+    def _json(status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        return httpx.Response(
+            status,
+            content=json.dumps(payload).encode(),
+            headers={"content-type": "application/json", **(headers or {})},
+        )
+
+    def _error(self, status: int, code: str, message: str, details: Optional[str] = None) -> httpx.Response:
+        return self._json(status, {"code": code, "message": message, "details": details, "hint": None})
@@ -0,0 +1,10 @@
+-- Daily unique-visitor estimates merged from the Redis HyperLogLogs
+-- (set_post_daily_unique_views in functions.sql).
+alter table posts add column if not exists unique_views bigint not null default 0;
+
+create table if not exists post_daily_unique_views (
+  post_id bigint references posts(id) on delete cascade,
+  day date not null,
+  uniques bigint not null,
+  primary key (post_id, day)
+);
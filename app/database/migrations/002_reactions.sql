@@ -0,0 +1,9 @@
+-- Likes and bookmarks, written in batches from the Redis queue
+-- (apply_reactions in functions.sql).
+create table if not exists reactions (
+  user_id uuid references profiles(user_id) on delete cascade,
+  post_id bigint references posts(id) on delete cascade,
+  type text not null check (type in ('like', 'bookmark')),
+  created_at timestamptz not null default now(),
+  primary key (user_id, post_id, type)
+);
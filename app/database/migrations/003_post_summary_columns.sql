@@ -0,0 +1,23 @@
+-- Summary columns written by create_post/update_post, so listings can skip
+-- posts.content (GET /posts/?view=summary or ?fields=...).
+alter table posts add column if not exists excerpt text not null default '';
+alter table posts add column if not exists word_count integer not null default 0;
+alter table posts add column if not exists reading_time integer not null default 0;
+
+-- Backfill existing posts the way _reading_stats derives them (with the
+-- default post_excerpt_length and reading_words_per_minute of 200).
+-- Only rows not filled in yet are touched, so re-running is harmless.
+with stats as (
+  select id, btrim(regexp_replace(regexp_replace(content, '<[^>]+>', ' ', 'g'), '\s+', ' ', 'g')) as text
+  from posts
+  where word_count = 0 and content <> ''
+)
+update posts p set
+  word_count = coalesce(array_length(string_to_array(s.text, ' '), 1), 0),
+  reading_time = ceil(coalesce(array_length(string_to_array(s.text, ' '), 1), 0) / 200.0),
+  excerpt = case
+    when length(s.text) <= 200 then s.text
+    else regexp_replace(left(s.text, 200), ' [^ ]*$', '') || '…'
+  end
+from stats s
+where p.id = s.id;
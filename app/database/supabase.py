@@ -1,28 +1,384 @@
-import os
-from supabase import create_client, Client
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
 from app.config import settings
 
+
+class APIError(Exception):
+    """Error returned by PostgREST (mirrors supabase-py's APIError)"""
+
+    def __init__(self, error: Dict[str, Any], status_code: Optional[int] = None):
+        self.message = error.get("message", "")
+        self.code = error.get("code")
+        self.details = error.get("details")
+        self.hint = error.get("hint")
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+class AuthApiError(Exception):
+    """Error returned by the GoTrue auth API"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        self.message = message
+        self.status = status
+        super().__init__(message)
+
+
+class APIResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class AuthUser:
+    def __init__(self, payload: Dict[str, Any]):
+        self.id = payload.get("id")
+        self.email = payload.get("email")
+        self.role = payload.get("role")
+        self.created_at = payload.get("created_at")
+        self.user_metadata = payload.get("user_metadata") or {}
+
+
+class AuthResponse:
+    def __init__(self, user: Optional[AuthUser], session: Optional[Dict[str, Any]] = None):
+        self.user = user
+        self.session = session
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _quote(value: Any) -> str:
+    """Quote a value for use inside a PostgREST list, e.g. in.(...)"""
+    text = _format_value(value)
+    if any(c in text for c in ',()" '):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class QueryBuilder:
+    """Awaitable PostgREST query, chained like supabase-py's builder"""
+
+    def __init__(self, client: "AsyncSupabase", path: str, method: str = "GET", body: Any = None):
+        self._client = client
+        self._path = path
+        self._method = method
+        self._body = body
+        self._params: List[tuple] = []
+        self._order: List[str] = []
+        self._prefer: List[str] = []
+        self._single = False
+        self._maybe_single = False
+        self._timeout: Optional[float] = None
+
+    # Operations
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "QueryBuilder":
+        self._params.append(("select", "".join(columns.split())))
+        if count:
+            self._prefer.append(f"count={count}")
+        return self
+
+    def insert(
+        self,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+        returning: str = "representation",
+    ) -> "QueryBuilder":
+        self._method = "POST"
+        self._body = data
+        self._prefer.append(f"return={returning}")
+        if upsert:
+            self._prefer.append("resolution=merge-duplicates")
+        if on_conflict:
+            self._params.append(("on_conflict", on_conflict))
+        if isinstance(data, list) and data:
+            # Bulk inserts need an explicit column list when rows differ
+            columns = sorted({key for row in data for key in row})
+            self._params.append(("columns", ",".join(columns)))
+        return self
+
+    def upsert(
+        self,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        on_conflict: Optional[str] = None,
+        returning: str = "representation",
+    ) -> "QueryBuilder":
+        return self.insert(data, upsert=True, on_conflict=on_conflict, returning=returning)
+
+    def update(self, data: Dict[str, Any], returning: str = "representation") -> "QueryBuilder":
+        self._method = "PATCH"
+        self._body = data
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def delete(self, returning: str = "representation") -> "QueryBuilder":
+        self._method = "DELETE"
+        self._prefer.append(f"return={returning}")
+        return self
+
+    # Filters
+    def _filter(self, column: str, operator: str, value: Any) -> "QueryBuilder":
+        self._params.append((column, f"{operator}.{value}"))
+        return self
+
+    def eq(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter(column, "eq", _format_value(value))
+
+    def neq(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter(column, "neq", _format_value(value))
+
+    def gt(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter(column, "gt", _format_value(value))
+
+    def gte(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter(column, "gte", _format_value(value))
+
+    def lt(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter(column, "lt", _format_value(value))
+
+    def lte(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter(column, "lte", _format_value(value))
+
+    def like(self, column: str, pattern: str) -> "QueryBuilder":
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column: str, pattern: str) -> "QueryBuilder":
+        return self._filter(column, "ilike", pattern)
+
+    def is_(self, column: str, value: Any) -> "QueryBuilder":
+        return self._filter(column, "is", _format_value(value))
+
+    def in_(self, column: str, values: List[Any]) -> "QueryBuilder":
+        return self._filter(column, "in", "(" + ",".join(_quote(v) for v in values) + ")")
+
+    def or_(self, filters: str) -> "QueryBuilder":
+        self._params.append(("or", f"({filters})"))
+        return self
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None) -> "QueryBuilder":
+        clause = f"{column}.{'desc' if desc else 'asc'}"
+        if nullsfirst is not None:
+            clause += ".nullsfirst" if nullsfirst else ".nullslast"
+        self._order.append(clause)
+        return self
+
+    def limit(self, size: int) -> "QueryBuilder":
+        self._params.append(("limit", str(size)))
+        return self
+
+    def offset(self, size: int) -> "QueryBuilder":
+        self._params.append(("offset", str(size)))
+        return self
+
+    def range(self, start: int, end: int) -> "QueryBuilder":
+        return self.offset(start).limit(end - start + 1)
+
+    def single(self) -> "QueryBuilder":
+        self._single = True
+        return self
+
+    def maybe_single(self) -> "QueryBuilder":
+        # Like single() but resolves to None instead of raising on zero rows
+        self._maybe_single = True
+        return self.limit(1)
+
+    def timeout(self, seconds: float) -> "QueryBuilder":
+        self._timeout = seconds
+        return self
+
+    async def execute(self) -> APIResponse:
+        params = list(self._params)
+        if self._order:
+            params.append(("order", ",".join(self._order)))
+
+        headers = {}
+        if self._prefer:
+            headers["Prefer"] = ",".join(self._prefer)
+        if self._single:
+            headers["Accept"] = "application/vnd.pgrst.object+json"
+
+        response = await self._client.request(
+            self._method,
+            self._path,
+            params=params,
+            headers=headers,
+            body=self._body,
+            timeout=self._timeout,
+        )
+
+        data = response.json() if response.content else None
+        count = None
+        content_range = response.headers.get("content-range")
+        if content_range and "/" in content_range:
+            total = content_range.split("/")[-1]
+            count = int(total) if total.isdigit() else None
+
+        if self._maybe_single:
+            data = data[0] if data else None
+        return APIResponse(data, count)
+
+
+class AsyncAuth:
+    """Minimal async GoTrue client covering the calls the app makes"""
+
+    def __init__(self, client: "AsyncSupabase"):
+        self._client = client
+
+    async def _post(self, path: str, body: Dict[str, Any], params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        response = await self._client.request("POST", path, params=params, body=body, raise_for=None)
+        payload = response.json() if response.content else {}
+        if response.status_code >= 400:
+            message = (
+                payload.get("error_description")
+                or payload.get("msg")
+                or payload.get("message")
+                or payload.get("error")
+                or response.reason_phrase
+            )
+            raise AuthApiError(message, response.status_code)
+        return payload
+
+    async def sign_up(self, credentials: Dict[str, Any]) -> AuthResponse:
+        body = {"email": credentials["email"], "password": credentials["password"]}
+        options = credentials.get("options") or {}
+        if options.get("data"):
+            body["data"] = options["data"]
+        payload = await self._post("/auth/v1/signup", body)
+        # With email confirmation enabled GoTrue returns the bare user object
+        user = payload.get("user") or (payload if "id" in payload else None)
+        session = payload if "access_token" in payload else None
+        return AuthResponse(AuthUser(user) if user else None, session)
+
+    async def sign_in_with_password(self, credentials: Dict[str, Any]) -> AuthResponse:
+        payload = await self._post(
+            "/auth/v1/token",
+            {"email": credentials["email"], "password": credentials["password"]},
+            params={"grant_type": "password"},
+        )
+        user = payload.get("user")
+        return AuthResponse(AuthUser(user) if user else None, payload)
+
+
+class AsyncSupabase:
+    """Non-blocking Supabase data-access client over a pooled httpx.AsyncClient.
+
+    Every call goes through one keep-alive connection pool per worker, so a
+    slow PostgREST round trip only suspends the awaiting request instead of
+    stalling the event loop.
+    """
+
+    def __init__(self, url: str, key: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = url.rstrip("/")
+        self.key = key
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self.auth = AsyncAuth(self)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.url,
+                headers={
+                    "apikey": self.key,
+                    "Authorization": f"Bearer {self.key}",
+                    "Content-Type": "application/json",
+                },
+                timeout=httpx.Timeout(settings.supabase_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.supabase_max_connections,
+                    max_keepalive_connections=settings.supabase_max_keepalive_connections,
+                    keepalive_expiry=settings.supabase_keepalive_expiry,
+                ),
+                transport=self._transport,
+            )
+        return self._http
+
+    def table(self, name: str) -> QueryBuilder:
+        return QueryBuilder(self, f"/rest/v1/{name}")
+
+    def rpc(self, function: str, params: Optional[Dict[str, Any]] = None) -> QueryBuilder:
+        return QueryBuilder(self, f"/rest/v1/rpc/{function}", method="POST", body=params or {})
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        timeout: Optional[float] = None,
+        raise_for: Optional[type] = APIError,
+    ) -> httpx.Response:
+        content = json.dumps(body, default=_json_default) if body is not None else None
+        response = await self.http.request(
+            method,
+            path,
+            params=params,
+            headers=headers,
+            content=content,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        if raise_for is not None and response.status_code >= 400:
+            try:
+                error = response.json()
+            except ValueError:
+                error = {"message": response.text}
+            raise raise_for(error if isinstance(error, dict) else {"message": str(error)}, response.status_code)
+        return response
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
 class SupabaseClient:
     _instance = None
 
     @classmethod
-    def get_client(cls) -> Client:
+    def get_client(cls) -> AsyncSupabase:
         if cls._instance is None:
-            cls._instance = create_client(
-                settings.supabase_url, 
-                settings.supabase_key
+            transport = None
+            if settings.supabase_local:
+                # In-memory PostgREST stand-in, no network involved
+                from app.database.local import LocalPostgREST
+                transport = LocalPostgREST(latency_ms=settings.supabase_local_latency_ms)
+            cls._instance = AsyncSupabase(
+                settings.supabase_url,
+                settings.supabase_key,
+                transport=transport
             )
         return cls._instance
 
     @classmethod
     async def connect(cls):
-        # Supabase client is synchronous, so no async connect needed
-        cls.get_client()
+        # Open the connection pool up front so the first request doesn't pay for it
+        cls.get_client().http
 
     @classmethod
     async def disconnect(cls):
-        # Supabase client doesn't have explicit disconnect
-        cls._instance = None
+        # Close pooled connections; the client reopens lazily if used again
+        if cls._instance:
+            await cls._instance.aclose()
 
 # Initialize on import
-sb_client = SupabaseClient.get_client()
\ No newline at end of file
+sb_client = SupabaseClient.get_client()
@@ -1,11 +1,19 @@
 from fastapi import FastAPI, HTTPException
 from app.database import supabase, redis
 from app.routes import auth
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from app.database.supabase import SupabaseClient
 from app.database.redis import redis_client
-from app.routes import auth, posts, comments, ws
+from app.routes import auth, posts, comments, reactions, ws
 from app.services.post import sync_views_to_db
+from app.services.reaction import sync_reactions_to_db
+from app.services.cache import listen_for_invalidations, cache_stats
+from app.services.views import view_aggregator
+from app.services.categories import category_catalog
+from app.utils.revocation import revocation_list
+from app.utils.pubsub import hub
+from app.utils.loader import RequestScopeMiddleware
+from app.utils.security import get_admin_user
 from app.config import settings
 import asyncio
 from contextlib import asynccontextmanager
@@ -15,24 +23,36 @@ async def lifespan(app: FastAPI):
     # Startup
     await SupabaseClient.connect()
     await redis_client.initialize()
+    await category_catalog.load()
     
     # Start background tasks
+    view_aggregator.start()
+    revocation_list.start()
     background_task = asyncio.create_task(periodic_sync_views())
+    reaction_task = asyncio.create_task(periodic_sync_reactions())
+    invalidation_task = asyncio.create_task(listen_for_invalidations())
+    category_task = asyncio.create_task(category_catalog.listen())
     
     print("✅ Connected to databases")
     
     yield
     
     # Shutdown
-    # Cancel background task
-    background_task.cancel()
-    try:
-        await background_task
-    except asyncio.CancelledError:
-        pass
+    # Cancel background tasks
+    for task in (background_task, reaction_task, invalidation_task, category_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
+    await revocation_list.stop()
+    await hub.close()
     
-    # Sync views one last time
+    # Flush buffered views and sync them one last time
+    await view_aggregator.stop()
     await sync_views_to_db()
+    await sync_reactions_to_db()
     
     # Close connections
     await SupabaseClient.disconnect()
@@ -42,21 +62,37 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(lifespan=lifespan)
 
+# Batch loaders (app/services/loaders.py) are shared within one request
+app.add_middleware(RequestScopeMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(posts.router)
 app.include_router(comments.router)
+app.include_router(reactions.router)
 app.include_router(ws.router)
 
 async def periodic_sync_views():
     """Periodically sync view counts to database"""
     while True:
-        await asyncio.sleep(300)  # Every 5 minutes
+        await asyncio.sleep(settings.view_sync_interval)
         try:
-            await sync_views_to_db()
+            report = await sync_views_to_db()
+            if report["posts"]:
+                print(f"Synced {report['views']} views for {report['posts']} posts "
+                      f"in {report['batches']} batches ({report['elapsed_ms']} ms)")
         except Exception as e:
             print(f"Error syncing views: {str(e)}")
 
+async def periodic_sync_reactions():
+    """Periodically write queued reaction changes to the database"""
+    while True:
+        await asyncio.sleep(settings.reaction_sync_interval)
+        try:
+            await sync_reactions_to_db()
+        except Exception as e:
+            print(f"Error syncing reactions: {str(e)}")
+
 @app.get("/")
 def health_check():
     return {
@@ -66,4 +102,13 @@ def health_check():
             "supabase": "connected",
             "redis": "connected"
         }
-    }
\ No newline at end of file
+    }
+
+# Cache, view and socket internals: admins only
+@app.get("/metrics", dependencies=[Depends(get_admin_user)])
+def metrics():
+    return {
+        "cache": cache_stats(),
+        "views": view_aggregator.stats(),
+        "ws": hub.stats()
+    }
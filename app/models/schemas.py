@@ -1,5 +1,5 @@
 # app/models/schemas.py
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, create_model
 from datetime import datetime
 from typing import List, Optional, Any
 from enum import Enum
@@ -43,6 +43,12 @@ class UserResponse(BaseModel):
     avatar_url: Optional[str] = None
     bio: Optional[str] = None
 
+class TokenUser(BaseModel):
+    """Caller identity as needed for authorization checks"""
+    id: str
+    role: UserRole
+    username: str
+
 # Post Schemas
 class PostCreate(BaseModel):
     title: str
@@ -56,10 +62,16 @@ class PostResponse(BaseModel):
     title: str
     slug: str
     content: str
+    # Derived from content on every write
+    excerpt: str = ""
+    word_count: int = 0
+    reading_time: int = 0  # minutes
     status: PostStatus
     author_id: str
     author_username: str
     views: int
+    # Approximate daily-unique visitors (HyperLogLog), summed over days
+    unique_views: int = 0
     created_at: datetime
     updated_at: datetime
     categories: List[dict]
@@ -68,6 +80,19 @@ class PostResponse(BaseModel):
     user_has_liked: bool = False
     user_has_bookmarked: bool = False
 
+# Sparse fieldsets: every PostResponse field, all optional, dumped with include=
+PostFields = create_model(
+    "PostFields",
+    **{name: (Optional[field.annotation], None) for name, field in PostResponse.model_fields.items()}
+)
+
+class ReactionSummary(BaseModel):
+    post_id: int
+    like_count: int = 0
+    bookmark_count: int = 0
+    user_has_liked: bool = False
+    user_has_bookmarked: bool = False
+
 # Comment Schemas
 class CommentCreate(BaseModel):
     content: str
@@ -80,6 +105,7 @@ class CommentResponse(BaseModel):
     username: str
     avatar_url: Optional[str]
     created_at: datetime
+    reply_count: int = 0
     replies: List['CommentResponse'] = []
 
 # Fix circular reference
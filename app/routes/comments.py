@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, Path
+from fastapi import APIRouter, Depends, Path, Query, Request
 from app.services import comment as comment_service
-from app.models.schemas import CommentCreate, CommentResponse
-from app.utils.security import get_current_user
-from typing import List
+from app.models.schemas import CommentCreate, CommentResponse, TokenUser
+from app.utils.security import get_current_principal
+from app.utils import jsonbytes
+from app.utils.etag import make_etag, matches, cache_headers, not_modified
+from app.config import settings
+from typing import List, Optional
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
@@ -10,27 +13,59 @@ router = APIRouter(prefix="/comments", tags=["Comments"])
 async def create_comment(
     post_id: int,
     comment_data: CommentCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_principal)
 ):
     return await comment_service.create_comment(post_id, comment_data, current_user.id)
 
 @router.get("/{post_id}", response_model=List[CommentResponse])
 async def get_comments_for_post(
-    post_id: int = Path(..., title="The ID of the post to get comments for")
+    request: Request,
+    post_id: int = Path(..., title="The ID of the post to get comments for"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$", description="Top-level comment order"),
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor")
 ):
-    return await comment_service.get_comments_for_post(post_id)
+    # Any comment change on the post bumps its version, so no body is read for a 304
+    etag = make_etag(post_id, await comment_service.comments_version(post_id), order, limit, cursor)
+    headers = cache_headers(etag, settings.comment_cache_control)
+    if matches(request, etag):
+        return not_modified(headers)
+
+    body, next_cursor = await comment_service.get_comments_for_post(post_id, order, limit, cursor)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return jsonbytes.json_response(body, headers)
+
+@router.get("/{post_id}/replies/{comment_id}", response_model=List[CommentResponse])
+async def get_replies(
+    request: Request,
+    post_id: int,
+    comment_id: int,
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$", description="Reply order"),
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor")
+):
+    etag = make_etag(post_id, await comment_service.comments_version(post_id), comment_id, order, limit, cursor)
+    headers = cache_headers(etag, settings.comment_cache_control)
+    if matches(request, etag):
+        return not_modified(headers)
+
+    body, next_cursor = await comment_service.get_replies(post_id, comment_id, order, limit, cursor)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return jsonbytes.json_response(body, headers)
 
 @router.put("/{comment_id}", response_model=CommentResponse)
 async def update_comment(
     comment_id: int,
     comment_data: CommentCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_principal)
 ):
     return await comment_service.update_comment(comment_id, comment_data, current_user.id)
 
 @router.delete("/{comment_id}")
 async def delete_comment(
     comment_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_principal)
 ):
     return await comment_service.delete_comment(comment_id, current_user.id)
\ No newline at end of file
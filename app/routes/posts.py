@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, Path, Query, HTTPException
+from fastapi import APIRouter, Depends, Path, Query, HTTPException, Request, Response
 from app.services import post as post_service
-from app.models.schemas import PostCreate, PostResponse
-from app.utils.security import get_current_user
+from app.services import reaction as reaction_service
+from app.services.views import visitor_identity
+from app.models.schemas import PostCreate, PostResponse, TokenUser
+from app.utils.security import get_current_principal, get_optional_user_id
+from app.utils import jsonbytes, compression
+from app.utils.etag import make_etag, matches, cache_headers, not_modified
+from app.config import settings
 from typing import List, Optional
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
@@ -9,49 +14,115 @@ router = APIRouter(prefix="/posts", tags=["Posts"])
 @router.post("/", response_model=PostResponse)
 async def create_post(
     post_data: PostCreate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_principal)
 ):
     return await post_service.create_post(post_data, current_user.id)
 
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post_by_id(
+    request: Request,
     post_id: int = Path(..., title="The ID of the post to get"),
-    increment_view: bool = Query(False, description="Increment view count")
+    increment_view: bool = Query(False, description="Increment view count"),
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
-    post = await post_service.get_post_by_id(post_id)
+    # A cached version proves the post exists without reading its body
+    post = None
+    version = await post_service.get_post_version(post_id)
+    if version is None:
+        post = await post_service.get_post_document(post_id)
+        version = post.version
     if increment_view:
-        await post_service.increment_view_count(post_id)
-    return post
+        await post_service.increment_view_count(post_id, visitor_identity(request, user_id))
+    return await _post_response(request, post_id, version, post, user_id)
 
 @router.get("/slug/{slug}", response_model=PostResponse)
 async def get_post_by_slug(
+    request: Request,
     slug: str = Path(..., title="The slug of the post to get"),
-    increment_view: bool = Query(False, description="Increment view count")
+    increment_view: bool = Query(False, description="Increment view count"),
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
-    post = await post_service.get_post_by_slug(slug)
+    post = None
+    post_id = await post_service.resolve_slug(slug)
+    version = await post_service.get_post_version(post_id) if post_id else None
+    if version is None:
+        post = await post_service.get_post_document_by_slug(slug)
+        post_id, version = post.id, post.version
     if increment_view:
-        await post_service.increment_view_count(post.id)
-    return post
+        await post_service.increment_view_count(post_id, visitor_identity(request, user_id))
+    return await _post_response(request, post_id, version, post, user_id)
+
+async def _post_response(
+    request: Request,
+    post_id: int,
+    version: Optional[str],
+    post: Optional[post_service.PostDocument],
+    user_id: Optional[str]
+) -> Response:
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    # Each encoding is its own representation, with its own strong ETag
+    etag = make_etag(
+        post_id,
+        version,
+        await reaction_service.reactions_version(post_id),
+        user_id or "",
+        encoding or "identity"
+    )
+    headers = cache_headers(etag, settings.post_cache_control, user_id)
+    headers["Vary"] += ", Accept-Encoding"
+    if matches(request, etag):
+        return not_modified(headers)
+
+    if post is None:
+        post = await post_service.get_post_document(post_id)
+    # Cached bytes go out as-is; response_model only documents the shape
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        body = await post_service.render_post_encoded(post, encoding, user_id)
+    else:
+        body, = await post_service.render_posts([post], user_id)
+    return jsonbytes.json_response(body, headers)
 
 @router.put("/{post_id}", response_model=PostResponse)
 async def update_post(
     post_id: int, 
     post_data: PostCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_principal)
 ):
     return await post_service.update_post(post_id, post_data, current_user.id)
 
 @router.delete("/{post_id}")
 async def delete_post(
     post_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_principal)
 ):
     return await post_service.delete_post(post_id, current_user.id)
 
 @router.get("/", response_model=List[PostResponse])
 async def list_posts(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    status: Optional[str] = Query(None)
+    status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; takes precedence over page"),
+    view: str = Query("full", pattern="^(full|summary)$", description="summary leaves out the content"),
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return; takes precedence over view"),
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
-    return await post_service.list_posts(page, limit, status)
\ No newline at end of file
+    projection = post_service.resolve_fields(view, fields)
+    posts = None
+    version = await post_service.get_list_version(page, limit, status, cursor, projection)
+    if version is None:
+        posts, next_cursor, version = await post_service.list_posts(page, limit, status, cursor, projection)
+
+    etag = make_etag("list", version, await reaction_service.reactions_version(), user_id or "")
+    headers = cache_headers(etag, settings.post_list_cache_control, user_id)
+    if matches(request, etag):
+        return not_modified(headers)
+
+    if posts is None:
+        posts, next_cursor, _ = await post_service.list_posts(page, limit, status, cursor, projection)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    body = jsonbytes.array(await post_service.render_posts(posts, user_id, projection))
+    return jsonbytes.json_response(body, headers)
\ No newline at end of file
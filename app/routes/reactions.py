@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.services import reaction as reaction_service
+from app.services import post as post_service
+from app.models.schemas import ReactionSummary, ReactionType, TokenUser
+from app.utils.security import get_current_principal, get_optional_user_id
+from typing import Optional
+
+router = APIRouter(prefix="/reactions", tags=["Reactions"])
+
+async def _require_post(post_id: int):
+    # Reaction keys are only ever created for posts that exist
+    if not await post_service.post_exists(post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+@router.get("/{post_id}", response_model=ReactionSummary)
+async def get_reactions(
+    post_id: int,
+    user_id: Optional[str] = Depends(get_optional_user_id)
+):
+    await _require_post(post_id)
+    summary = await reaction_service.get_reactions([post_id], user_id)
+    return ReactionSummary(post_id=post_id, **summary[post_id])
+
+@router.put("/{post_id}/{reaction_type}", response_model=ReactionSummary)
+async def add_reaction(
+    post_id: int,
+    reaction_type: ReactionType,
+    current_user: TokenUser = Depends(get_current_principal)
+):
+    await _require_post(post_id)
+    summary = await reaction_service.set_reaction(post_id, current_user.id, reaction_type, True)
+    return ReactionSummary(post_id=post_id, **summary)
+
+@router.delete("/{post_id}/{reaction_type}", response_model=ReactionSummary)
+async def remove_reaction(
+    post_id: int,
+    reaction_type: ReactionType,
+    current_user: TokenUser = Depends(get_current_principal)
+):
+    await _require_post(post_id)
+    summary = await reaction_service.set_reaction(post_id, current_user.id, reaction_type, False)
+    return ReactionSummary(post_id=post_id, **summary)
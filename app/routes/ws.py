@@ -1,25 +1,76 @@
-from fastapi import APIRouter, WebSocket
-from app.database.redis import redis_client
+from fastapi import APIRouter, WebSocket, status
+from app.utils.pubsub import hub, Subscription, SlowConsumer, replay_events, parse_event_id
+from typing import Optional
+import asyncio
 import json
+import time
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
+def comment_event(event_id: Optional[str], data: dict):
+    """Format a comments:{post_id} message once for all sockets; keyed by comment id"""
+    # Handle deletion message
+    if "deleted" in data:
+        return data["deleted"], {"action": "delete", "id": data["deleted"], "event_id": event_id}
+    return data.get("id"), {"action": "update", "comment": data, "event_id": event_id}
+
+async def _replay(websocket: WebSocket, subscription: Subscription, last_event_id: str):
+    """Send the events a reconnecting client missed before it goes live"""
+    events = await replay_events(subscription.channel, last_event_id)
+    if events is None:
+        # Too far behind for the stream; the client refetches the comments
+        await websocket.send_json({"action": "reset"})
+        return
+    for event_id, data in events:
+        _, payload = comment_event(event_id, data)
+        await websocket.send_text(json.dumps(payload))
+    subscription.resume_after = parse_event_id(events[-1][0] if events else last_event_id)
+
+async def _forward(websocket: WebSocket, subscription: Subscription):
+    """Send pre-serialized hub messages to one socket until it fails"""
+    try:
+        while True:
+            message = await subscription.get()
+            started = time.perf_counter()
+            await websocket.send_text(message.text)
+            hub.record_send(time.perf_counter() - started)
+    except asyncio.CancelledError:
+        raise
+    except SlowConsumer:
+        await _close(websocket, status.WS_1013_TRY_AGAIN_LATER)
+    except Exception as e:
+        print(f"Error sending message: {str(e)}")
+        await _close(websocket, status.WS_1011_INTERNAL_ERROR)
+
+async def _close(websocket: WebSocket, code: int):
+    try:
+        await websocket.close(code=code)
+    except Exception:
+        pass
+
 @router.websocket("/comments/{post_id}")
-async def comment_websocket(websocket: WebSocket, post_id: int):
+async def comment_websocket(websocket: WebSocket, post_id: int, last_event_id: Optional[str] = None):
     await websocket.accept()
-    pubsub = redis_client.pubsub()
-    await pubsub.subscribe(f"comments:{post_id}")
-    
-    async for message in pubsub.listen():
-        if message["type"] == "message":
+    # Subscribe before reading the stream so nothing falls between replay and live
+    subscription = await hub.subscribe(f"comments:{post_id}", comment_event)
+    sender = None
+
+    try:
+        last_event_id = last_event_id or websocket.headers.get("last-event-id")
+        if last_event_id:
+            await _replay(websocket, subscription, last_event_id)
+        sender = asyncio.create_task(_forward(websocket, subscription))
+
+        # Clients don't send anything; this just waits for the disconnect
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        if sender:
+            sender.cancel()
             try:
-                data = json.loads(message["data"])
-                # Handle deletion message
-                if "deleted" in data:
-                    await websocket.send_json({"action": "delete", "id": data["deleted"]})
-                else:
-                    await websocket.send_json({"action": "update", "comment": data})
-            except Exception as e:
-                print(f"Error sending message: {str(e)}")
-    
-    await pubsub.unsubscribe(f"comments:{post_id}")
\ No newline at end of file
+                await sender
+            except asyncio.CancelledError:
+                pass
+        await hub.unsubscribe(subscription)
@@ -4,15 +4,17 @@ from fastapi.security import OAuth2PasswordRequestForm
 from app.utils.security import (
     authenticate_user, 
     create_access_token, 
+    decode_access_token,
+    token_claims,
     oauth2_scheme,
     get_current_user
 )
 from app.models.schemas import UserRegister, UserResponse, Token, UserRole, UserLogin
-from app.database.supabase import sb_client  # Import directly
+from app.database.supabase import sb_client, AuthApiError  # Import directly
+from app.utils.revocation import revocation_list
 from datetime import timedelta
 from app.config import settings
-from jose import jwt, JWTError
-from supabase import AuthApiError # Corrected import path for AuthApiError
+from jose import JWTError
 
 router = APIRouter()
 
@@ -20,7 +22,7 @@ router = APIRouter()
 async def register(user_data: UserRegister):
     # 1. Check if username exists in profiles table to prevent duplicates
     try:
-        existing_user_profile = sb_client.table("profiles") \
+        existing_user_profile = await sb_client.table("profiles") \
             .select("user_id") \
             .eq("username", user_data.username) \
             .limit(1).execute()
@@ -39,7 +41,7 @@ async def register(user_data: UserRegister):
     
     # 2. Attempt to create user in Supabase Auth
     try:
-        auth_response = sb_client.auth.sign_up({
+        auth_response = await sb_client.auth.sign_up({
             "email": user_data.email,
             "password": user_data.password,
             "options": {
@@ -64,7 +66,7 @@ async def register(user_data: UserRegister):
         }
         
         # Insert the new profile into the 'profiles' table
-        sb_client.table("profiles") \
+        await sb_client.table("profiles") \
             .insert(profile_data) \
             .execute()
             
@@ -126,7 +128,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.id}, 
+        data=token_claims(user.id, user.role.value, user.username), 
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -143,7 +145,7 @@ async def login_json(user_data: UserLogin):
     
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.id}, 
+        data=token_claims(user.id, user.role.value, user.username), 
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -153,11 +155,7 @@ async def refresh_token(token: str = Depends(oauth2_scheme)):
     # In a real implementation, you'd typically use a dedicated refresh token for this.
     # For simplicity, this example reissues an access token based on the existing (but valid) access token.
     try:
-        payload = jwt.decode(
-            token, 
-            settings.jwt_secret, 
-            algorithms=[settings.jwt_algorithm]
-        )
+        payload = decode_access_token(token)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(
@@ -167,7 +165,7 @@ async def refresh_token(token: str = Depends(oauth2_scheme)):
             
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         new_access_token = create_access_token(
-            data={"sub": user_id}, 
+            data=token_claims(user_id, payload.get("role"), payload.get("username")), 
             expires_delta=access_token_expires
         )
         return {"access_token": new_access_token, "token_type": "bearer"}
@@ -183,6 +181,27 @@ async def refresh_token(token: str = Depends(oauth2_scheme)):
             detail=f"An unexpected error occurred during token refresh: {str(e)}"
         )
 
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme)):
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token or token has expired.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not payload.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token cannot be revoked; it has no token id."
+        )
+    
+    # Revoked until the token would have expired anyway
+    await revocation_list.revoke(payload["jti"], payload["exp"])
+    return {"message": "Logged out successfully"}
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: UserResponse = Depends(get_current_user)):
     # Renamed the function to avoid shadowing the imported 'get_current_user' dependency
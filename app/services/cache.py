@@ -0,0 +1,345 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.database.redis import redis_client
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+# Per-key invalidation counters outlive any load that could race with them
+GENERATION_TTL = 86400
+
+# Swap a value in place, only if it is still exactly what the caller read
+_REPLACE_IF_UNCHANGED = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl > 0 then redis.call('SET', KEYS[1], ARGV[2], 'PX', ttl)
+else redis.call('SET', KEYS[1], ARGV[2]) end
+return 1
+""")
+
+# Write an entry only if its key wasn't invalidated since the load began.
+# KEYS: generation, value, version, aliases...; ARGV: expected generation
+# ('' if none), ttl, value, version ('' if none), canonical key
+_SET_IF_GENERATION = redis_client.register_script("""
+if (redis.call('GET', KEYS[1]) or '') ~= ARGV[1] then return 0 end
+redis.call('SETEX', KEYS[2], ARGV[2], ARGV[3])
+if ARGV[4] ~= '' then redis.call('SETEX', KEYS[3], ARGV[2], ARGV[4]) end
+for i = 4, #KEYS do redis.call('SETEX', KEYS[i], ARGV[2], ARGV[5]) end
+return 1
+""")
+
+# namespace -> cache, so invalidation messages can be routed
+_registry: Dict[str, "TwoTierCache"] = {}
+
+
+class LocalCache:
+    """Bounded in-process LRU with per-entry TTL and an optional byte budget"""
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int], ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            self.expirations += 1
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int = 0, ttl: Optional[float] = None):
+        # Without a byte budget only the entry count bounds the cache
+        max_bytes = float("inf") if self.max_bytes is None else self.max_bytes
+        if size > max_bytes:
+            return
+        self.delete(key)
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= entry[1]
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+
+class LoadToken(NamedTuple):
+    epoch: int
+    generation: str
+
+
+class TwoTierCache:
+    """In-process LRU/TTL tier in front of Redis.
+
+    Local hits skip the Redis round trip and deserialization entirely.
+    Invalidations delete the Redis key and are broadcast over pub/sub so
+    every worker drops its local copy.
+
+    Each value is stored once under its canonical key; secondary lookups
+    (e.g. slug -> id) go through small alias entries that point at it. An
+    optional version string (e.g. for ETags) is kept next to each value so
+    it can be checked without reading the value itself.
+
+    Loads from the database take a ``LoadToken`` first (``begin_load``) and
+    hand it to ``set``; an invalidation of the key in between, on any
+    worker, turns that write into a no-op so a stale load is never cached.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        loads: Callable[[str], Any],
+        dumps: Callable[[Any], str],
+        local_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.loads = loads
+        self.dumps = dumps
+        self.local = LocalCache(
+            max_entries or settings.local_cache_max_entries,
+            max_bytes or settings.local_cache_max_bytes,
+            local_ttl or settings.local_cache_ttl
+        )
+        self.local_aliases = LocalCache(
+            max_entries or settings.local_cache_max_entries,
+            max_bytes or settings.local_cache_max_bytes,
+            local_ttl or settings.local_cache_ttl
+        )
+        self.local_versions = LocalCache(
+            max_entries or settings.local_cache_max_entries,
+            max_bytes or settings.local_cache_max_bytes,
+            local_ttl or settings.local_cache_ttl
+        )
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Bumped on every invalidation; a Redis read that raced with one
+        # must not repopulate the local tier with the stale value
+        self._epoch = 0
+        _registry[namespace] = self
+
+    def redis_key(self, key: Any) -> str:
+        return f"{self.namespace}:{key}"
+
+    def version_key(self, key: Any) -> str:
+        return f"{self.namespace}:{key}:version"
+
+    def generation_key(self, key: Any) -> str:
+        return f"{self.namespace}:{key}:gen"
+
+    async def begin_load(self, key: Any) -> "LoadToken":
+        """Call before reading the source of truth for a key"""
+        epoch = self._epoch
+        return LoadToken(epoch, await redis_client.get(self.generation_key(key)) or "")
+
+    async def get(self, key: Any) -> Optional[Any]:
+        key = str(key)
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        epoch = self._epoch
+        raw = await redis_client.get(self.redis_key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.redis_hits += 1
+        value = self.loads(raw)
+        if epoch == self._epoch:
+            self.local.set(key, value, len(raw))
+        return value
+
+    async def resolve(self, alias: str) -> Optional[str]:
+        """Map an alias to its canonical key, or None if not indexed"""
+        key = self.local_aliases.get(alias)
+        if key is not None:
+            return key
+
+        epoch = self._epoch
+        key = await redis_client.get(self.redis_key(alias))
+        if key is not None and epoch == self._epoch:
+            self.local_aliases.set(alias, key, len(key))
+        return key
+
+    async def version(self, key: Any) -> Optional[str]:
+        """Version stored with the value, or None if the key isn't cached"""
+        key = str(key)
+        version = self.local_versions.get(key)
+        if version is not None:
+            return version
+
+        epoch = self._epoch
+        version = await redis_client.get(self.version_key(key))
+        if version is not None and epoch == self._epoch:
+            self.local_versions.set(key, version, len(version))
+        return version
+
+    async def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        aliases: Iterable[str] = (),
+        version: Optional[str] = None,
+        token: Optional["LoadToken"] = None
+    ) -> bool:
+        """Store an entry; with a token from begin_load, only if the key
+        hasn't been invalidated since. Returns whether it was stored."""
+        key = str(key)
+        ttl = ttl or self.ttl
+        raw = self.dumps(value)
+        aliases = list(aliases)
+
+        if token is not None:
+            stored = await _SET_IF_GENERATION(
+                keys=[
+                    self.generation_key(key),
+                    self.redis_key(key),
+                    self.version_key(key),
+                    *[self.redis_key(alias) for alias in aliases]
+                ],
+                args=[token.generation, ttl, raw, version or "", key]
+            )
+            # The local check also covers invalidations this worker has
+            # heard of before Redis saw them
+            if not stored or token.epoch != self._epoch:
+                return False
+        else:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(self.redis_key(key), ttl, raw)
+                for alias in aliases:
+                    pipe.setex(self.redis_key(alias), ttl, key)
+                if version is not None:
+                    pipe.setex(self.version_key(key), ttl, version)
+                await pipe.execute()
+
+        self.local.set(key, value, len(raw), ttl)
+        for alias in aliases:
+            self.local_aliases.set(alias, key, len(key), ttl)
+        if version is not None:
+            self.local_versions.set(key, version, len(version), ttl)
+        return True
+
+    async def replace(self, key: Any, expected: Any, value: Any) -> bool:
+        """Update a cached value in place (keeping its TTL) unless it was
+        invalidated or rewritten since ``expected`` was read"""
+        key = str(key)
+        epoch = self._epoch
+        raw = self.dumps(value)
+        if not await _REPLACE_IF_UNCHANGED(keys=[self.redis_key(key)], args=[self.dumps(expected), raw]):
+            return False
+        if epoch == self._epoch:
+            self.local.set(key, value, len(raw))
+        return True
+
+    async def invalidate(self, *keys: Any, aliases: Iterable[str] = ()):
+        keys = [str(key) for key in keys]
+        aliases = list(aliases)
+        if not keys and not aliases:
+            return
+        self.invalidations += len(keys)
+        self.evict_local(keys, aliases)
+
+        # One round trip: drop the entries and tell the other workers
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(
+                *[self.redis_key(name) for name in keys + aliases],
+                *[self.version_key(key) for key in keys]
+            )
+            for key in keys:
+                pipe.incr(self.generation_key(key))
+                pipe.expire(self.generation_key(key), GENERATION_TTL)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps({
+                "ns": self.namespace,
+                "keys": keys,
+                "aliases": aliases
+            }))
+            await pipe.execute()
+
+    def evict_local(self, keys=None, aliases=()):
+        """Drop keys (or everything) from this worker's local tier only"""
+        self._epoch += 1
+        if keys is None:
+            self.local.clear()
+            self.local_aliases.clear()
+            self.local_versions.clear()
+            return
+        for key in keys:
+            self.local.delete(key)
+            self.local_versions.delete(key)
+        for alias in aliases:
+            self.local_aliases.delete(alias)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "local_evictions": self.local.evictions,
+            "local_expirations": self.local.expirations,
+            "local_entries": len(self.local),
+            "local_bytes": self.local.bytes
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {namespace: cache.stats() for namespace, cache in _registry.items()}
+
+
+async def listen_for_invalidations():
+    """Drop local entries invalidated by any worker (runs for the app lifetime)"""
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = json.loads(message["data"])
+                cache = _registry.get(data.get("ns"))
+                if cache:
+                    cache.evict_local(data.get("keys", []), data.get("aliases", []))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Cache invalidation listener error: {str(e)}")
+            # Entries may have been missed while disconnected
+            for cache in _registry.values():
+                cache.evict_local()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,76 @@
+from fastapi import HTTPException
+from app.database.supabase import sb_client
+from app.database.redis import redis_client
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import time
+
+# Published by whatever changes the categories table (admin tools, migrations)
+CATEGORIES_CHANNEL = "categories:changed"
+
+class CategoryCatalog:
+    """Per-worker copy of the categories table.
+
+    Loaded at startup and reloaded whenever a message arrives on
+    ``CATEGORIES_CHANNEL``, so resolving names and validating ids never
+    touches the database. An id the copy doesn't know triggers one reload
+    before it is rejected, in case a change notification was missed.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[int, dict] = {}
+        self._lock = asyncio.Lock()
+        self.loaded_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    async def load(self):
+        async with self._lock:
+            result = await sb_client.table("categories").select("id, name").execute()
+            self._by_id = {row["id"]: row for row in result.data}
+            self.loaded_at = time.time()
+
+    def get(self, category_id: int) -> Optional[dict]:
+        return self._by_id.get(category_id)
+
+    def names(self, category_ids: Iterable[int]) -> List[dict]:
+        """Categories in the shape PostResponse uses, skipping unknown ids"""
+        return [{"name": self._by_id[i]["name"]} for i in category_ids if i in self._by_id]
+
+    async def validate(self, category_ids: Iterable[int]) -> List[int]:
+        """Distinct ids in request order; 400 if any category doesn't exist"""
+        ids = list(dict.fromkeys(category_ids))
+        if any(i not in self._by_id for i in ids):
+            await self.load()
+        unknown = [i for i in ids if i not in self._by_id]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown category ids: {unknown}")
+        return ids
+
+    async def listen(self):
+        """Reload on change notifications (runs for the app lifetime)"""
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(CATEGORIES_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Category listener error: {str(e)}")
+                await asyncio.sleep(1)
+                # Changes may have been missed while disconnected
+                try:
+                    await self.load()
+                except Exception:
+                    pass
+            finally:
+                await pubsub.aclose()
+
+async def notify_categories_changed():
+    await redis_client.publish(CATEGORIES_CHANNEL, "1")
+
+category_catalog = CategoryCatalog()
@@ -2,16 +2,181 @@ from fastapi import Depends, HTTPException, status
 from app.database.supabase import sb_client
 from app.database.redis import redis_client
 from app.utils.security import get_current_user
-from app.utils import pubsub
+from app.utils import pubsub, jsonbytes
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.etag import counter_seed, counter_version
 from app.models.comment import Comment
 from app.models.schemas import CommentCreate, CommentResponse
+from app.services import loaders
+from app.config import settings
+from collections import defaultdict
+from datetime import datetime
+from redis.exceptions import WatchError
 import json
-from typing import List
+from typing import List, Optional, Tuple
+
+# Marks a loaded comment hash, so posts without comments stay cached too
+LOADED_FIELD = "_loaded"
+
+def nodes_key(post_id) -> str:
+    """Hash of comment id -> final CommentResponse JSON (without reply_count) for one post"""
+    return f"comments:{post_id}:nodes"
+
+def children_key(post_id, parent_id=None) -> str:
+    """Ordering index: ZSET of a parent's (or the post's top-level) comment ids by created_at"""
+    return f"comments:{post_id}:children:{parent_id if parent_id is not None else 'root'}"
+
+def reply_counts_key(post_id) -> str:
+    """Hash of parent comment id (or root) -> number of direct children, for one post"""
+    return f"comments:{post_id}:reply_counts"
+
+def rev_key(post_id) -> str:
+    """Bumped on every comment write to the post"""
+    return f"comments:{post_id}:rev"
+
+def _score(row: dict) -> int:
+    # created_at in epoch milliseconds
+    return int(datetime.fromisoformat(row["created_at"].replace("Z", "+00:00")).timestamp() * 1000)
+
+# Patch a single node, but only into a tree that is already cached; a cold
+# post is loaded in full by the next reader. Writes and page reads slide the
+# TTL of the hash, the counts and the index they touch, so a busy thread
+# stays cached; an index left to expire on its own is caught by the page
+# script and triggers a reload.
+_UPSERT_NODE = redis_client.register_script("""
+redis.call('SET', KEYS[3], ARGV[6], 'NX')
+redis.call('INCR', KEYS[3])
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1]) == 1 then
+    redis.call('HINCRBY', KEYS[4], ARGV[4], 1)
+end
+for i = 1, 4 do
+    if i ~= 3 then redis.call('PEXPIRE', KEYS[i], ARGV[5]) end
+end
+return 1
+""")
+
+_DELETE_NODE = redis_client.register_script("""
+redis.call('SET', KEYS[3], ARGV[4], 'NX')
+redis.call('INCR', KEYS[3])
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+redis.call('HDEL', KEYS[1], ARGV[1])
+if redis.call('ZREM', KEYS[2], ARGV[1]) == 1 then
+    redis.call('HINCRBY', KEYS[5], ARGV[2], -1)
+end
+redis.call('HDEL', KEYS[5], ARGV[1])
+redis.call('DEL', KEYS[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+redis.call('PEXPIRE', KEYS[2], ARGV[3])
+redis.call('PEXPIRE', KEYS[5], ARGV[3])
+return 1
+""")
+
+def _parent_field(parent_id) -> str:
+    return str(parent_id) if parent_id is not None else "root"
+
+def _document(row: dict) -> str:
+    # Validated once here; reads splice in reply_count and serve the bytes as-is
+    return jsonbytes.document(CommentResponse(**comment_node(row)), exclude={"reply_count"}).decode()
+
+async def _cache_upsert(row: dict):
+    post_id = row["post_id"]
+    await _UPSERT_NODE(
+        keys=[
+            nodes_key(post_id),
+            children_key(post_id, row.get("parent_comment_id")),
+            rev_key(post_id),
+            reply_counts_key(post_id)
+        ],
+        args=[
+            row["id"],
+            _document(row),
+            _score(row),
+            _parent_field(row.get("parent_comment_id")),
+            settings.comment_cache_ttl * 1000,
+            counter_seed()
+        ]
+    )
+
+async def _cache_delete(row: dict):
+    post_id = row["post_id"]
+    await _DELETE_NODE(
+        keys=[
+            nodes_key(post_id),
+            children_key(post_id, row.get("parent_comment_id")),
+            rev_key(post_id),
+            children_key(post_id, row["id"]),
+            reply_counts_key(post_id)
+        ],
+        args=[
+            row["id"],
+            _parent_field(row.get("parent_comment_id")),
+            settings.comment_cache_ttl * 1000,
+            counter_seed()
+        ]
+    )
+
+async def _with_profiles(rows: List[dict]) -> List[dict]:
+    """Attach each commenter's profile (as "profiles", like a PostgREST embed)
+    using the request's batched profile loader"""
+    profiles = await loaders.profiles().load_many(row["user_id"] for row in rows)
+    for row in rows:
+        profile = profiles[row["user_id"]] or {}
+        row["profiles"] = {"username": profile.get("username"), "avatar_url": profile.get("avatar_url")}
+    return rows
+
+async def _load_comments(post_id: int) -> List[dict]:
+    """Fetch a post's comments and cache them as a node hash plus per-parent indexes"""
+    rev = await redis_client.get(rev_key(post_id))
+    try:
+        # All comments for the post in one query, parents before replies
+        result = await sb_client.table("comments") \
+            .select("*") \
+            .eq("post_id", post_id) \
+            .order("created_at") \
+            .order("id") \
+            .execute()
+        rows = await _with_profiles(result.data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching comments: {str(e)}")
+
+    children = defaultdict(dict)
+    for row in rows:
+        children[row.get("parent_comment_id")][row["id"]] = _score(row)
+
+    try:
+        async with redis_client.pipeline() as pipe:
+            # A write that lands while we were querying wins; skip caching
+            await pipe.watch(rev_key(post_id))
+            if await pipe.get(rev_key(post_id)) != rev:
+                return rows
+            pipe.multi()
+            key = nodes_key(post_id)
+            pipe.delete(key)
+            pipe.hset(key, mapping={LOADED_FIELD: "1", **{row["id"]: _document(row) for row in rows}})
+            pipe.expire(key, settings.comment_cache_ttl)
+            counts = reply_counts_key(post_id)
+            pipe.delete(counts)
+            if children:
+                pipe.hset(counts, mapping={
+                    _parent_field(parent_id): len(members) for parent_id, members in children.items()
+                })
+                pipe.expire(counts, settings.comment_cache_ttl)
+            for parent_id, members in children.items():
+                index = children_key(post_id, parent_id)
+                pipe.delete(index)
+                pipe.zadd(index, members)
+                pipe.expire(index, settings.comment_cache_ttl)
+            await pipe.execute()
+    except WatchError:
+        pass
+    return rows
 
 async def create_comment(post_id: int, comment_data: CommentCreate, user_id: str):
     try:
         # Verify post exists
-        post = sb_client.table("posts").select("id").eq("id", post_id).single().execute()
+        post = await sb_client.table("posts").select("id").eq("id", post_id).single().execute()
         if not post.data:
             raise HTTPException(status_code=404, detail="Post not found")
         
@@ -23,47 +188,167 @@ async def create_comment(post_id: int, comment_data: CommentCreate, user_id: str
             "content": comment_data.content
         }
         
-        result = sb_client.table("comments").insert(comment).execute()
+        result = await sb_client.table("comments").insert(comment).execute()
         new_comment = result.data[0] if result.data else None
         
         if not new_comment:
             raise HTTPException(status_code=500, detail="Failed to create comment")
+        await _with_profiles([new_comment])
+        
+        # Add it to the cached tree
+        await _cache_upsert(new_comment)
         
         # Publish real-time update
-        await pubsub.publish(f"comments:{post_id}", json.dumps(new_comment))
+        await pubsub.publish_event(f"comments:{post_id}", json.dumps(new_comment))
         
-        return CommentResponse(**new_comment)
+        return CommentResponse(**comment_node(new_comment))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating comment: {str(e)}")
 
-async def get_comments_for_post(post_id: int) -> List[CommentResponse]:
-    # Check cache first
-    cached = await redis_client.get(f"comments:{post_id}")
-    if cached:
-        return [CommentResponse(**c) for c in json.loads(cached)]
-    
-    try:
-        # Get top-level comments
-        result = sb_client.table("comments").select("*, profiles(username, avatar_url)").eq("post_id", post_id).is_("parent_comment_id", "null").order("created_at", desc=True).execute()
-        
-        comments = []
-        for comment in result.data:
-            # Get replies
-            replies = sb_client.table("comments").select("*, profiles(username, avatar_url)").eq("parent_comment_id", comment["id"]).order("created_at").execute()
-            comment["replies"] = replies.data
-            comments.append(comment)
-        
-        # Cache for 2 minutes
-        await redis_client.setex(f"comments:{post_id}", 120, json.dumps(comments))
-        
-        return [CommentResponse(**c) for c in comments]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching comments: {str(e)}")
+def comment_node(row: dict) -> dict:
+    """Response node for a comment row with its embedded author profile"""
+    profile = row.get("profiles") or {}
+    return {
+        "id": row["id"],
+        "content": row["content"],
+        "user_id": row["user_id"],
+        "username": profile.get("username") or "",
+        "avatar_url": profile.get("avatar_url"),
+        "created_at": row["created_at"],
+        "replies": []
+    }
+
+# One page of a parent's children: id, score, document and reply count of each.
+# Resumes from the cursor's member when it still exists, otherwise from its
+# score. Returns nil when the post's comments aren't cached, or when the
+# parent's index has drifted from its reply count (e.g. it expired alone).
+_CHILDREN_PAGE = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 0 then return false end
+if redis.call('ZCARD', KEYS[2]) ~= tonumber(redis.call('HGET', KEYS[3], ARGV[5]) or 0) then
+    return false
+end
+for i = 1, 3 do redis.call('PEXPIRE', KEYS[i], ARGV[6]) end
+local desc = ARGV[4] == '1'
+local count = tonumber(ARGV[3])
+local rank = false
+if ARGV[1] ~= '' then
+    if desc then rank = redis.call('ZREVRANK', KEYS[2], ARGV[1])
+    else rank = redis.call('ZRANK', KEYS[2], ARGV[1]) end
+end
+local items
+if rank then
+    local cmd = desc and 'ZREVRANGE' or 'ZRANGE'
+    items = redis.call(cmd, KEYS[2], rank + 1, rank + count, 'WITHSCORES')
+elseif ARGV[2] ~= '' then
+    if desc then items = redis.call('ZREVRANGEBYSCORE', KEYS[2], '(' .. ARGV[2], '-inf', 'WITHSCORES', 'LIMIT', 0, count)
+    else items = redis.call('ZRANGEBYSCORE', KEYS[2], '(' .. ARGV[2], '+inf', 'WITHSCORES', 'LIMIT', 0, count) end
+else
+    local cmd = desc and 'ZREVRANGE' or 'ZRANGE'
+    items = redis.call(cmd, KEYS[2], 0, count - 1, 'WITHSCORES')
+end
+local page = {}
+for i = 1, #items, 2 do
+    local doc = redis.call('HGET', KEYS[1], items[i])
+    if doc then
+        table.insert(page, items[i])
+        table.insert(page, items[i + 1])
+        table.insert(page, doc)
+        table.insert(page, tonumber(redis.call('HGET', KEYS[3], items[i]) or 0))
+    end
+end
+return page
+""")
+
+def _page_from_rows(
+    rows: List[dict],
+    parent_id: Optional[int],
+    order: str,
+    count: int,
+    position: Optional[Tuple[int, int]]
+) -> List[Tuple[int, int, str, int]]:
+    """Same page as _CHILDREN_PAGE, computed from freshly loaded rows"""
+    reply_counts = defaultdict(int)
+    for row in rows:
+        reply_counts[row.get("parent_comment_id")] += 1
+
+    # Sorted like the ZSET: by score, then by member
+    siblings = sorted(
+        ((_score(row), str(row["id"]), row) for row in rows if row.get("parent_comment_id") == parent_id),
+        key=lambda item: item[:2],
+        reverse=order == "desc"
+    )
+    if position:
+        after = (position[0], str(position[1]))
+        siblings = [item for item in siblings if (item[:2] < after if order == "desc" else item[:2] > after)]
+    return [(row["id"], score, _document(row), reply_counts[row["id"]]) for score, _, row in siblings[:count]]
+
+async def _children_page(
+    post_id: int,
+    parent_id: Optional[int],
+    order: str,
+    limit: Optional[int],
+    cursor: Optional[str]
+) -> Tuple[bytes, Optional[str]]:
+    # Cursor pointing just past (created_at score, id) among siblings
+    position = decode_cursor(cursor, int, int) if cursor else None
+    limit = limit or settings.comment_page_size
+    # One extra item tells us whether there is a next page
+    keys = [nodes_key(post_id), children_key(post_id, parent_id), reply_counts_key(post_id)]
+    args = [
+        position[1] if position else "",
+        position[0] if position else "",
+        limit + 1,
+        int(order == "desc"),
+        _parent_field(parent_id),
+        settings.comment_cache_ttl * 1000
+    ]
+
+    result = await _CHILDREN_PAGE(keys=keys, args=args)
+    if result is None:
+        rows = await _load_comments(post_id)
+        page = _page_from_rows(rows, parent_id, order, limit + 1, position)
+    else:
+        page = [
+            (int(result[i]), int(float(result[i + 1])), result[i + 2], result[i + 3])
+            for i in range(0, len(result), 4)
+        ]
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1][1], page[-1][0])
+    body = jsonbytes.array(
+        jsonbytes.merge(doc.encode(), {"reply_count": reply_count}) for _, _, doc, reply_count in page
+    )
+    return body, next_cursor
+
+async def comments_version(post_id: int) -> str:
+    """Changes on every comment write to the post (never repeats, see app.utils.etag)"""
+    return await counter_version(rev_key(post_id))
+
+async def get_comments_for_post(
+    post_id: int,
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[bytes, Optional[str]]:
+    """JSON body of a page of top-level comments, each with its reply count, and the next cursor"""
+    return await _children_page(post_id, None, order or settings.comment_order, limit, cursor)
+
+async def get_replies(
+    post_id: int,
+    comment_id: int,
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[bytes, Optional[str]]:
+    """JSON body of a page of a comment's direct replies, each with its own reply count"""
+    return await _children_page(post_id, comment_id, order or settings.comment_reply_order, limit, cursor)
 
 async def update_comment(comment_id: int, comment_data: CommentCreate, user_id: str):
     try:
         # Verify ownership
-        existing = sb_client.table("comments").select("*").eq("id", comment_id).single().execute()
+        existing = await sb_client.table("comments").select("*").eq("id", comment_id).single().execute()
         if not existing.data or existing.data["user_id"] != user_id:
             raise HTTPException(status_code=403, detail="Not authorized to update this comment")
         
@@ -73,34 +358,34 @@ async def update_comment(comment_id: int, comment_data: CommentCreate, user_id:
         }
         
         # Update comment
-        result = sb_client.table("comments").update(update_data).eq("id", comment_id).execute()
-        updated_comment = result.data[0] if result.data else None
+        result = await sb_client.table("comments").update(update_data).eq("id", comment_id).execute()
+        updated_comment = (await _with_profiles(result.data))[0]
         
-        # Invalidate cache
-        await redis_client.delete(f"comments:{existing.data['post_id']}")
+        # Patch the cached node
+        await _cache_upsert(updated_comment)
         
         # Publish update
-        await pubsub.publish(f"comments:{existing.data['post_id']}", json.dumps(updated_comment))
+        await pubsub.publish_event(f"comments:{existing.data['post_id']}", json.dumps(updated_comment))
         
-        return CommentResponse(**updated_comment)
+        return CommentResponse(**comment_node(updated_comment))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating comment: {str(e)}")
 
 async def delete_comment(comment_id: int, user_id: str):
     try:
         # Verify ownership
-        existing = sb_client.table("comments").select("*").eq("id", comment_id).single().execute()
+        existing = await sb_client.table("comments").select("*").eq("id", comment_id).single().execute()
         if not existing.data or existing.data["user_id"] != user_id:
             raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
         
         # Delete comment
-        sb_client.table("comments").delete().eq("id", comment_id).execute()
+        await sb_client.table("comments").delete().eq("id", comment_id).execute()
         
-        # Invalidate cache
-        await redis_client.delete(f"comments:{existing.data['post_id']}")
+        # Remove the cached node
+        await _cache_delete(existing.data)
         
         # Publish deletion
-        await pubsub.publish(f"comments:{existing.data['post_id']}", json.dumps({"deleted": comment_id}))
+        await pubsub.publish_event(f"comments:{existing.data['post_id']}", json.dumps({"deleted": comment_id}))
         
         return {"message": "Comment deleted successfully"}
     except Exception as e:
@@ -0,0 +1,31 @@
+from collections import defaultdict
+from typing import Dict, List
+from app.database.supabase import sb_client
+from app.services.categories import category_catalog
+from app.utils.loader import DataLoader, request_loader
+
+async def _profiles_by_user_id(user_ids: List[str]) -> Dict[str, dict]:
+    result = await sb_client.table("profiles") \
+        .select("user_id, username, avatar_url") \
+        .in_("user_id", user_ids) \
+        .execute()
+    return {row["user_id"]: row for row in result.data}
+
+async def _categories_by_post_id(post_ids: List[int]) -> Dict[int, List[dict]]:
+    # Names come from the in-memory catalog, so no join
+    result = await sb_client.table("post_categories") \
+        .select("post_id, category_id") \
+        .in_("post_id", post_ids) \
+        .execute()
+    category_ids = defaultdict(list)
+    for row in result.data:
+        category_ids[row["post_id"]].append(row["category_id"])
+    return {post_id: category_catalog.names(category_ids[post_id]) for post_id in post_ids}
+
+def profiles() -> DataLoader:
+    """user id -> {user_id, username, avatar_url} (None if there is no profile)"""
+    return request_loader(_profiles_by_user_id)
+
+def post_categories() -> DataLoader:
+    """post id -> [{name}, ...]"""
+    return request_loader(_categories_by_post_id)
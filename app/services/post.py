@@ -1,16 +1,100 @@
 from fastapi import Depends, HTTPException, status
 from app.database.supabase import sb_client
 from app.database.redis import redis_client
+from redis.exceptions import ResponseError
 from app.utils.security import get_current_user
 from app.models.post import Post, PostStatus
-from app.models.schemas import PostCreate, PostResponse
-from app.utils import pubsub
+from app.models.schemas import PostCreate, PostResponse, PostFields
+from app.config import settings
+from app.utils import pubsub, jsonbytes, compression
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.etag import content_version
+from app.utils.locks import acquire_lock, release_lock
+from app.services.cache import TwoTierCache
+from app.services import reaction as reaction_service
+from app.services import loaders
+from app.services.categories import category_catalog
+from app.services.views import (
+    view_aggregator,
+    unique_views_key,
+    PENDING_VIEWS_KEY,
+    DIRTY_UNIQUE_VIEWS_KEY
+)
+import asyncio
 import json
+import math
+import re
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
+
+# Reaction counts and the viewer's own reactions are layered over the shared
+# post documents per request and never cached with them
+OVERLAY_FIELDS = {"like_count", "bookmark_count", "user_has_liked", "user_has_bookmarked"}
+
+# What GET /posts/?view=summary returns: everything but the content
+SUMMARY_FIELDS = frozenset(PostResponse.model_fields) - {"content"}
+# PostResponse fields that aren't columns of posts
+_COMPUTED_FIELDS = {"author_username", "categories"} | OVERLAY_FIELDS
+
+_TAG = re.compile(r"<[^>]+>")
+
+class PostDocument(NamedTuple):
+    id: int
+    # Final PostResponse JSON without the overlay fields
+    body: bytes
+    # Content hash stored next to the cached body (ETags); None if not at hand
+    version: Optional[str] = None
+    # encoding -> compressed body without its closing brace (see app.utils.compression)
+    encoded: Optional[Dict[str, bytes]] = None
+
+def _dump_entry(entry: Tuple[bytes, Dict[str, bytes]]) -> str:
+    # The document line (orjson never emits a raw newline), then one line per encoding
+    body, encoded = entry
+    return body.decode() + ("\n" + compression.pack(encoded) if encoded else "")
+
+def _load_entry(raw: str) -> Tuple[bytes, Dict[str, bytes]]:
+    body, _, encoded = raw.partition("\n")
+    return body.encode(), compression.unpack(encoded)
+
+# Post id -> (document bytes, precompressed variants), served without
+# parsing, re-validation or compression. Versioned so entries never share a
+# key with the single-JSON "post:{id}" / "post:slug:{slug}" format of older
+# releases during a rolling deploy
+post_cache = TwoTierCache(
+    "post:v2",
+    ttl=settings.post_cache_ttl,
+    loads=_load_entry,
+    dumps=_dump_entry
+)
+
+DRAINING_VIEWS_KEY = "post_views:draining"
+DRAINING_UNIQUE_VIEWS_KEY = "post_uv:dirty:draining"
+VIEW_FLUSH_LOCK_KEY = "post_views:flush_lock"
+
+# Bumped on every post write; list pages are cached under the current value
+POST_LIST_GENERATION_KEY = "posts:list:gen"
+
+async def invalidate_post_lists():
+    """Invalidate every cached list page in O(1) by moving to a new generation"""
+    await redis_client.incr(POST_LIST_GENERATION_KEY)
+
+def _reading_stats(content: str) -> dict:
+    """Excerpt, word count and reading time, stored with the post so
+    listings never need the content"""
+    words = _TAG.sub(" ", content).split()
+    excerpt = " ".join(words)
+    if len(excerpt) > settings.post_excerpt_length:
+        excerpt = excerpt[:settings.post_excerpt_length].rsplit(" ", 1)[0] + "…"
+    return {
+        "excerpt": excerpt,
+        "word_count": len(words),
+        "reading_time": math.ceil(len(words) / settings.reading_words_per_minute)
+    }
 
 async def create_post(post_data: PostCreate, user_id: str):
+    category_ids = await category_catalog.validate(post_data.category_ids)
     try:
         # Generate slug
         slug = f"{post_data.title.lower().replace(' ', '-')}-{str(uuid.uuid4())[:8]}"
@@ -21,161 +105,442 @@ async def create_post(post_data: PostCreate, user_id: str):
             "title": post_data.title,
             "slug": slug,
             "content": post_data.content,
+            **_reading_stats(post_data.content),
             "status": post_data.status.value,
             "scheduled_at": post_data.scheduled_at,
             "views": 0
         }
         
         # Insert into database
-        result = sb_client.table("posts").insert(post).execute()
+        result = await sb_client.table("posts").insert(post).execute()
         new_post = result.data[0] if result.data else None
         
         if not new_post:
             raise HTTPException(status_code=500, detail="Failed to create post")
         
         # Add categories
-        if post_data.category_ids:
-            for category_id in post_data.category_ids:
-                sb_client.table("post_categories").insert({
-                    "post_id": new_post["id"],
-                    "category_id": category_id
-                }).execute()
-        
-        return PostResponse(**new_post)
+        if category_ids:
+            await sb_client.table("post_categories").insert([
+                {"post_id": new_post["id"], "category_id": category_id}
+                for category_id in category_ids
+            ], returning="minimal").execute()
+        
+        await invalidate_post_lists()
+        
+        return (await _hydrate([new_post]))[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating post: {str(e)}")
 
-async def get_post_by_id(post_id: int) -> PostResponse:
-    # Check cache first
-    cached = await redis_client.get(f"post:{post_id}")
-    if cached:
-        return PostResponse(**json.loads(cached))
+def _slug_alias(slug: str) -> str:
+    return f"slug:{slug}"
+
+async def _nothing() -> dict:
+    return {}
+
+async def _hydrate(rows: List[dict], fields: Optional[FrozenSet[str]] = None) -> List[Union[PostResponse, PostFields]]:
+    """Build responses for post rows, fetching authors and categories with one
+    batched query per table for everything the request needs. With ``fields``
+    the rows are a projection and only the requested lookups are made."""
+    authors = fields is None or "author_username" in fields
+    with_categories = fields is None or "categories" in fields
+    profiles, categories = await asyncio.gather(
+        loaders.profiles().load_many(row["author_id"] for row in rows) if authors else _nothing(),
+        loaders.post_categories().load_many(row["id"] for row in rows) if with_categories else _nothing()
+    )
+
+    model = PostResponse if fields is None else PostFields
+    posts = []
+    for row in rows:
+        row = dict(row)
+        if authors:
+            row["author_username"] = (profiles[row["author_id"]] or {}).get("username") or ""
+        if with_categories:
+            row["categories"] = categories[row["id"]]
+        posts.append(model(**row))
+    return posts
+
+def _document(post: Union[PostResponse, PostFields], fields: Optional[FrozenSet[str]] = None) -> PostDocument:
+    body = jsonbytes.document(post, include=fields, exclude=OVERLAY_FIELDS)
+    return PostDocument(post.id, body, content_version(body))
+
+def resolve_fields(view: Optional[str] = None, fields: Optional[str] = None) -> Optional[FrozenSet[str]]:
+    """The PostResponse fields a listing asked for (``fields`` wins over
+    ``view``); None means full posts. The id is always included."""
+    if fields:
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = names - set(PostResponse.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {sorted(unknown)}")
+        return frozenset(names | {"id"})
+    if view == "summary":
+        return SUMMARY_FIELDS
+    return None
+
+def _columns(fields: Optional[FrozenSet[str]]) -> str:
+    """Projection of posts needed to build the given fields"""
+    if fields is None:
+        return "*"
+    # created_at for the keyset cursor, author_id for the author lookup
+    columns = set(fields - _COMPUTED_FIELDS) | {"id", "created_at"}
+    if "author_username" in fields:
+        columns.add("author_id")
+    return ", ".join(sorted(columns))
+
+async def _load_post(post_id: int) -> PostDocument:
+    """Fetch a post from the database and cache it under its canonical id"""
+    # An update_post that invalidates the post meanwhile makes the set a no-op
+    token = await post_cache.begin_load(post_id)
+    try:
+        result = await sb_client.table("posts").select("*").eq("id", post_id).maybe_single().execute()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching post: {str(e)}")
+    post = result.data if result else None
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
     
     try:
-        result = sb_client.table("posts").select("*").eq("id", post_id).single().execute()
-        post = result.data
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
+        document = _document((await _hydrate([post]))[0])
+        # Compressed once per cache entry, off the event loop
+        encoded = await asyncio.to_thread(
+            compression.compress_prefix,
+            document.body[:-1],
+            settings.post_gzip_level,
+            settings.post_brotli_quality
+        )
+        document = document._replace(encoded=encoded)
+        await post_cache.set(
+            post["id"],
+            (document.body, encoded),
+            aliases=[_slug_alias(post["slug"])],
+            version=document.version,
+            token=token
+        )
         
-        # Get categories
-        categories = sb_client.table("post_categories").select("categories(name)").eq("post_id", post_id).execute()
-        post["categories"] = [cat["categories"] for cat in categories.data]
-        
-        # Cache for 5 minutes
-        await redis_client.setex(f"post:{post_id}", 300, json.dumps(post))
-        
-        return PostResponse(**post)
+        return document
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching post: {str(e)}")
 
-async def get_post_by_slug(slug: str) -> PostResponse:
+async def get_post_document(post_id: int) -> PostDocument:
     # Check cache first
-    cached = await redis_client.get(f"post:slug:{slug}")
+    cached = await post_cache.get(post_id)
     if cached:
-        return PostResponse(**json.loads(cached))
+        body, encoded = cached
+        return PostDocument(post_id, body, encoded=encoded)
+    
+    return await _load_post(post_id)
+
+async def get_post_document_by_slug(slug: str) -> PostDocument:
+    # Resolve the slug to the canonical post entry
+    post_id = await resolve_slug(slug)
+    if post_id:
+        cached = await post_cache.get(post_id)
+        if cached:
+            body, encoded = cached
+            return PostDocument(post_id, body, encoded=encoded)
     
+    # Loads go by id, so they can be guarded against concurrent invalidation
     try:
-        result = sb_client.table("posts").select("*").eq("slug", slug).single().execute()
-        post = result.data
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-        
-        # Get categories
-        categories = sb_client.table("post_categories").select("categories(name)").eq("post_id", post["id"]).execute()
-        post["categories"] = [cat["categories"] for cat in categories.data]
-        
-        # Cache for 5 minutes
-        await redis_client.setex(f"post:slug:{slug}", 300, json.dumps(post))
-        
-        return PostResponse(**post)
+        result = await sb_client.table("posts").select("id").eq("slug", slug).maybe_single().execute()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching post: {str(e)}")
+    if not result or not result.data:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return await _load_post(result.data["id"])
+
+async def get_post_version(post_id: int) -> Optional[str]:
+    """Version of the cached post document, without reading the document"""
+    return await post_cache.version(post_id)
+
+async def post_exists(post_id: int) -> bool:
+    """Cheap existence check: the cache entry, else a one-column lookup"""
+    if await post_cache.version(post_id) is not None:
+        return True
+    try:
+        result = await sb_client.table("posts").select("id").eq("id", post_id).maybe_single().execute()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching post: {str(e)}")
+    return bool(result and result.data)
+
+async def resolve_slug(slug: str) -> Optional[int]:
+    post_id = await post_cache.resolve(_slug_alias(slug))
+    return int(post_id) if post_id else None
 
 async def update_post(post_id: int, post_data: PostCreate, user_id: str):
+    if post_data.category_ids is not None:
+        category_ids = await category_catalog.validate(post_data.category_ids)
     try:
         # Verify ownership
-        existing = sb_client.table("posts").select("*").eq("id", post_id).single().execute()
+        existing = await sb_client.table("posts").select("*").eq("id", post_id).single().execute()
         if not existing.data or existing.data["author_id"] != user_id:
             raise HTTPException(status_code=403, detail="Not authorized to update this post")
         
         update_data = {
             "title": post_data.title,
             "content": post_data.content,
+            **_reading_stats(post_data.content),
             "status": post_data.status.value,
             "scheduled_at": post_data.scheduled_at,
             "updated_at": datetime.utcnow().isoformat()
         }
         
         # Update post
-        result = sb_client.table("posts").update(update_data).eq("id", post_id).execute()
+        result = await sb_client.table("posts").update(update_data).eq("id", post_id).execute()
         
         # Update categories
         if post_data.category_ids is not None:
-            # Remove existing categories
-            sb_client.table("post_categories").delete().eq("post_id", post_id).execute()
-            # Add new categories
-            for category_id in post_data.category_ids:
-                sb_client.table("post_categories").insert({
-                    "post_id": post_id,
-                    "category_id": category_id
-                }).execute()
-        
-        # Invalidate cache
-        await redis_client.delete(f"post:{post_id}")
-        if "slug" in existing.data:
-            await redis_client.delete(f"post:slug:{existing.data['slug']}")
-        
-        return PostResponse(**result.data[0])
+            await _set_post_categories(post_id, category_ids)
+        
+        # Invalidate the post and its slug aliases on every worker
+        slugs = {existing.data["slug"], result.data[0]["slug"]}
+        await post_cache.invalidate(post_id, aliases=[_slug_alias(slug) for slug in slugs])
+        await invalidate_post_lists()
+        
+        return (await _hydrate(result.data))[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating post: {str(e)}")
 
+async def _set_post_categories(post_id: int, category_ids: List[int]):
+    """Bring a post's category links in line with category_ids, writing only the difference"""
+    existing = await sb_client.table("post_categories").select("category_id").eq("post_id", post_id).execute()
+    current = {row["category_id"] for row in existing.data}
+    wanted = set(category_ids)
+    
+    if current - wanted:
+        await sb_client.table("post_categories") \
+            .delete(returning="minimal") \
+            .eq("post_id", post_id) \
+            .in_("category_id", sorted(current - wanted)) \
+            .execute()
+    if wanted - current:
+        await sb_client.table("post_categories").insert([
+            {"post_id": post_id, "category_id": category_id}
+            for category_id in category_ids if category_id not in current
+        ], returning="minimal").execute()
+
 async def delete_post(post_id: int, user_id: str):
     try:
         # Verify ownership
-        existing = sb_client.table("posts").select("*").eq("id", post_id).single().execute()
+        existing = await sb_client.table("posts").select("*").eq("id", post_id).single().execute()
         if not existing.data or existing.data["author_id"] != user_id:
             raise HTTPException(status_code=403, detail="Not authorized to delete this post")
         
         # Delete post
-        sb_client.table("posts").delete().eq("id", post_id).execute()
+        await sb_client.table("posts").delete().eq("id", post_id).execute()
         
-        # Invalidate cache
-        await redis_client.delete(f"post:{post_id}")
-        if "slug" in existing.data:
-            await redis_client.delete(f"post:slug:{existing.data['slug']}")
+        # Invalidate the post and its slug alias on every worker
+        await post_cache.invalidate(post_id, aliases=[_slug_alias(existing.data["slug"])])
+        await invalidate_post_lists()
+        await reaction_service.drop_reactions(post_id)
         
         return {"message": "Post deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting post: {str(e)}")
 
-async def list_posts(page: int = 1, limit: int = 10, status: Optional[str] = None):
+async def _list_cache_key(
+    page: int,
+    limit: int,
+    status: Optional[str],
+    cursor: Optional[str],
+    fields: Optional[FrozenSet[str]]
+) -> str:
+    generation = await redis_client.get(POST_LIST_GENERATION_KEY) or 0
+    projection = ",".join(sorted(fields)) if fields is not None else "full"
+    return f"posts:list:{generation}:{status or 'all'}:{limit}:{projection}:{cursor or f'page={page}'}"
+
+async def get_list_version(
+    page: int = 1,
+    limit: int = 10,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[FrozenSet[str]] = None
+) -> Optional[str]:
+    """Version of a cached list page, without reading the page"""
+    return await redis_client.get(f"{await _list_cache_key(page, limit, status, cursor, fields)}:version")
+
+async def list_posts(
+    page: int = 1,
+    limit: int = 10,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[FrozenSet[str]] = None
+) -> Tuple[List[PostDocument], Optional[str], str]:
+    """Return a page of posts (newest first), the cursor for the next page
+    and the page's version.
+
+    With ``cursor`` the page is fetched by keyset on (created_at, id), which
+    costs the same at any depth and is stable under concurrent inserts;
+    otherwise the legacy ``page`` offset is used. ``fields`` (see
+    resolve_fields) limits both the selected columns and the documents.
+    """
+    # Keyset cursor pointing just past (created_at, id)
+    position = decode_cursor(cursor, str, int) if cursor else None
+    
+    # Check cache first
+    cache_key = await _list_cache_key(page, limit, status, cursor, fields)
+    cached, version = await redis_client.mget(cache_key, f"{cache_key}:version")
+    if cached and version:
+        # A JSON header line, then one document per line
+        header, *bodies = cached.encode().split(b"\n")
+        page_data = json.loads(header)
+        posts = [PostDocument(*entry) for entry in zip(page_data["ids"], bodies)]
+        return posts, page_data["next_cursor"], version
+    
     try:
-        offset = (page - 1) * limit
-        query = sb_client.table("posts").select("*").order("created_at", desc=True)
+        query = sb_client.table("posts").select(_columns(fields)) \
+            .order("created_at", desc=True) \
+            .order("id", desc=True)
         
         if status:
             query = query.eq("status", status)
         
-        result = query.range(offset, offset + limit - 1).execute()
-        return [PostResponse(**post) for post in result.data]
+        if position:
+            created_at, last_id = position
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{last_id})'
+            ).limit(limit)
+        else:
+            offset = (page - 1) * limit
+            query = query.range(offset, offset + limit - 1)
+        
+        result = await query.execute()
+        rows = result.data
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if len(rows) == limit else None
+        posts = [_document(post, fields) for post in await _hydrate(rows, fields)]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching posts: {str(e)}")
+    
+    # Stale generations are never read again and just expire
+    header = jsonbytes.dumps({"ids": [post.id for post in posts], "next_cursor": next_cursor})
+    raw = b"\n".join([header] + [post.body for post in posts])
+    version = content_version(raw)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.setex(cache_key, settings.post_list_cache_ttl, raw.decode())
+        pipe.setex(f"{cache_key}:version", settings.post_list_cache_ttl, version)
+        await pipe.execute()
+    return posts, next_cursor, version
+
+async def render_posts(
+    posts: List[PostDocument],
+    user_id: Optional[str] = None,
+    fields: Optional[FrozenSet[str]] = None
+) -> List[bytes]:
+    """Response bodies for shared post documents with reaction counts and the
+    viewer's flags spliced in, looked up for the whole page in one Redis round trip"""
+    if fields is not None and not fields & OVERLAY_FIELDS:
+        return [post.body for post in posts]
+    if not posts:
+        return []
+    overlay = await reaction_service.get_reactions([post.id for post in posts], user_id)
+    if fields is not None:
+        overlay = {
+            post_id: {name: value for name, value in summary.items() if name in fields}
+            for post_id, summary in overlay.items()
+        }
+    return [jsonbytes.merge(post.body, overlay[post.id]) for post in posts]
+
+async def render_post_encoded(post: PostDocument, encoding: str, user_id: Optional[str] = None) -> bytes:
+    """Like render_posts for one post, compressed: the overlay (and closing
+    brace) is appended to the precompressed document as an uncompressed tail"""
+    body, = await render_posts([post], user_id)
+    prefix = (post.encoded or {}).get(encoding)
+    if prefix is None:
+        # An entry cached without this variant: compress it once and store it
+        encoded = post.encoded or {}
+        variant = await asyncio.to_thread(
+            compression.compress_prefix,
+            post.body[:-1],
+            settings.post_gzip_level,
+            settings.post_brotli_quality,
+            (encoding,)
+        )
+        prefix = variant[encoding]
+        await post_cache.replace(post.id, (post.body, encoded), (post.body, {**encoded, **variant}))
+    return compression.complete(encoding, prefix, body[len(post.body) - 1:])
+
+async def increment_view_count(post_id: int, visitor: Optional[str] = None):
+    # Buffered in-process; flushed to Redis in batches, and to the
+    # database only by the periodic sync
+    view_aggregator.record(post_id, visitor)
+
+async def sync_views_to_db() -> dict:
+    """Add pending Redis view counts to posts.views in bulk.
+
+    The pending ZSET is drained atomically with RENAME, so views recorded
+    while the flush runs land in a fresh key instead of being lost. The
+    drained counts are sent to the increment_post_views RPC in batches and
+    removed only once their batch is committed; anything left over (e.g.
+    after a database error) is retried on the next run. Unique-visitor
+    estimates that changed since the last run are merged in the same pass.
+    """
+    started = time.perf_counter()
+    report = {"posts": 0, "views": 0, "batches": 0, "unique_posts": 0, "elapsed_ms": 0.0}
+    
+    # Only one worker flushes at a time
+    lock = await acquire_lock(VIEW_FLUSH_LOCK_KEY, settings.view_sync_lock_ttl)
+    if lock is None:
+        return report
 
-async def increment_view_count(post_id: int):
-    # Increment in Redis
-    await redis_client.zincrby("post_views", 1, post_id)
+    try:
+        if not await redis_client.exists(DRAINING_VIEWS_KEY):
+            try:
+                await redis_client.rename(PENDING_VIEWS_KEY, DRAINING_VIEWS_KEY)
+            except ResponseError:
+                # No pending views
+                pass
+        
+        while True:
+            batch = await redis_client.zrange(
+                DRAINING_VIEWS_KEY, 0, settings.view_sync_batch_size - 1, withscores=True
+            )
+            if not batch:
+                break
+            
+            payload = [{"id": int(post_id), "delta": int(count)} for post_id, count in batch]
+            await sb_client.rpc("increment_post_views", {"payload": payload}).execute()
+            await redis_client.zremrangebyrank(DRAINING_VIEWS_KEY, 0, len(batch) - 1)
+            
+            report["posts"] += len(payload)
+            report["views"] += sum(item["delta"] for item in payload)
+            report["batches"] += 1
+        
+        report["unique_posts"] = await _sync_unique_views()
+    finally:
+        await release_lock(VIEW_FLUSH_LOCK_KEY, lock)
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    return report
+
+async def _sync_unique_views() -> int:
+    """Write the current HyperLogLog estimate of every changed (post, day) to the database.
+
+    Daily estimates are set, not added, so re-sending a day is harmless;
+    the RPC recomputes posts.unique_views as the sum over days.
+    """
+    if not await redis_client.exists(DRAINING_UNIQUE_VIEWS_KEY):
+        try:
+            await redis_client.rename(DIRTY_UNIQUE_VIEWS_KEY, DRAINING_UNIQUE_VIEWS_KEY)
+        except ResponseError:
+            return 0
     
-    # Check if we need to sync to DB
-    sync_counter = await redis_client.incr("view_sync_counter")
-    if sync_counter % 100 == 0:  # Sync every 100 views
-        await sync_views_to_db()
-
-async def sync_views_to_db():
-    views = await redis_client.zrange("post_views", 0, -1, withscores=True)
-    for post_id, count in views:
-        # Update database
-        sb_client.table("posts").update({"views": int(count)}).eq("id", post_id).execute()
+    synced = 0
+    while True:
+        members = await redis_client.srandmember(DRAINING_UNIQUE_VIEWS_KEY, settings.view_sync_batch_size)
+        if not members:
+            break
+        
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for member in members:
+                post_id, day = member.split(":")
+                pipe.pfcount(unique_views_key(post_id, day))
+            counts = await pipe.execute()
+        
+        payload = []
+        for member, count in zip(members, counts):
+            post_id, day = member.split(":")
+            payload.append({"id": int(post_id), "day": f"{day[:4]}-{day[4:6]}-{day[6:]}", "uniques": count})
+        await sb_client.rpc("set_post_daily_unique_views", {"payload": payload}).execute()
+        await redis_client.srem(DRAINING_UNIQUE_VIEWS_KEY, *members)
+        synced += len(payload)
     
-    # Reset Redis views
-    await redis_client.delete("post_views")
-    await redis_client.delete("view_sync_counter")
\ No newline at end of file
+    return synced
@@ -0,0 +1,215 @@
+from fastapi import HTTPException
+from app.database.supabase import sb_client
+from app.database.redis import redis_client
+from app.models.schemas import ReactionType
+from app.config import settings
+from app.utils.locks import acquire_lock, release_lock
+from app.utils.etag import counter_seed, counter_version
+from collections import defaultdict
+from redis.exceptions import ResponseError, WatchError
+from typing import Dict, List, Optional
+import json
+import time
+
+# Reaction changes not yet written to the reactions table, oldest first
+PENDING_REACTIONS_KEY = "reactions:pending"
+DRAINING_REACTIONS_KEY = "reactions:pending:draining"
+REACTION_SYNC_LOCK_KEY = "reactions:sync:lock"
+# Bumped on every reaction change anywhere (list ETags)
+REACTIONS_REV_KEY = "reactions:rev"
+
+def reaction_key(reaction_type: str, post_id) -> str:
+    """SET of the user ids that gave a post one type of reaction"""
+    return f"reactions:{reaction_type}:{post_id}"
+
+def rev_key(post_id) -> str:
+    """Bumped on every reaction change to the post (post ETags)"""
+    return f"reactions:rev:{post_id}"
+
+REACTION_TYPES = [t.value for t in (ReactionType.LIKE, ReactionType.BOOKMARK)]
+
+def loaded_key(post_id) -> str:
+    """Present while a post's reactions are copied in Redis; expires with its
+    sets after reaction_cache_ttl without access"""
+    return f"reactions:loaded:{post_id}"
+
+# Add or remove a member and queue the change for the database, but only
+# when the membership actually changed. Returns -1 if the post isn't loaded.
+_SET_REACTION = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[3]) == 0 then return -1 end
+local changed
+if ARGV[2] == 'add' then changed = redis.call('SADD', KEYS[1], ARGV[1])
+else changed = redis.call('SREM', KEYS[1], ARGV[1]) end
+if changed == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[3])
+    redis.call('SET', KEYS[4], ARGV[5], 'NX')
+    redis.call('SET', KEYS[5], ARGV[5], 'NX')
+    redis.call('INCR', KEYS[4])
+    redis.call('INCR', KEYS[5])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return changed
+""")
+
+def _summary(counts: List[int], flags: List[bool]) -> dict:
+    return {
+        "like_count": counts[0],
+        "bookmark_count": counts[1],
+        "user_has_liked": bool(flags[0]),
+        "user_has_bookmarked": bool(flags[1])
+    }
+
+async def load_reactions(post_ids: List[int]):
+    """Copy the reactions of any of these posts that aren't in Redis yet from the database"""
+    keys = [loaded_key(post_id) for post_id in post_ids]
+    for _ in range(3):
+        try:
+            async with redis_client.pipeline() as pipe:
+                # Another worker may load (and then modify) the same posts meanwhile
+                await pipe.watch(*keys)
+                loaded = await pipe.mget(keys)
+                missing = [post_id for post_id, flag in zip(post_ids, loaded) if not flag]
+                if not missing:
+                    return
+
+                try:
+                    # Ids that aren't posts get no keys at all
+                    posts = await sb_client.table("posts").select("id").in_("id", missing).execute()
+                    existing = [row["id"] for row in posts.data]
+                    if not existing:
+                        return
+                    result = await sb_client.table("reactions") \
+                        .select("post_id, user_id, type") \
+                        .in_("post_id", existing) \
+                        .execute()
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail=f"Error fetching reactions: {str(e)}")
+
+                members = defaultdict(list)
+                for row in result.data:
+                    members[reaction_key(row["type"], row["post_id"])].append(row["user_id"])
+
+                pipe.multi()
+                for post_id in existing:
+                    # Leftovers of an expired copy are replaced, not merged
+                    pipe.delete(*[reaction_key(reaction_type, post_id) for reaction_type in REACTION_TYPES])
+                    pipe.set(loaded_key(post_id), 1, ex=settings.reaction_cache_ttl)
+                for key, user_ids in members.items():
+                    pipe.sadd(key, *user_ids)
+                    pipe.expire(key, settings.reaction_cache_ttl)
+                await pipe.execute()
+                return
+        except WatchError:
+            continue
+
+async def get_reactions(post_ids: List[int], user_id: Optional[str] = None) -> Dict[int, dict]:
+    """Counts and the viewer's own reactions for each post, answered from Redis"""
+    types = REACTION_TYPES
+    for attempt in range(2):
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for post_id in post_ids:
+                pipe.exists(loaded_key(post_id))
+                for reaction_type in types:
+                    pipe.scard(reaction_key(reaction_type, post_id))
+                for reaction_type in types:
+                    if user_id:
+                        pipe.sismember(reaction_key(reaction_type, post_id), user_id)
+            # Reads keep the copy alive; the marker and sets expire together
+            for post_id in post_ids:
+                pipe.expire(loaded_key(post_id), settings.reaction_cache_ttl)
+                for reaction_type in types:
+                    pipe.expire(reaction_key(reaction_type, post_id), settings.reaction_cache_ttl)
+            results = (await pipe.execute())[:-len(post_ids) * (1 + len(types))]
+
+        step = 1 + len(types) * (2 if user_id else 1)
+        rows = [results[i:i + step] for i in range(0, len(results), step)]
+        missing = [post_id for post_id, row in zip(post_ids, rows) if not row[0]]
+        if not missing or attempt:
+            break
+        await load_reactions(missing)
+
+    summaries = {}
+    for post_id, row in zip(post_ids, rows):
+        counts = row[1:1 + len(types)]
+        flags = row[1 + len(types):] or [False] * len(types)
+        summaries[post_id] = _summary(counts, flags)
+    return summaries
+
+async def set_reaction(post_id: int, user_id: str, reaction_type: ReactionType, active: bool) -> dict:
+    """Add or remove a user's reaction; the database catches up in the next sync"""
+    change = json.dumps({
+        "op": "add" if active else "remove",
+        "post_id": post_id,
+        "user_id": user_id,
+        "type": reaction_type.value
+    })
+    keys = [
+        reaction_key(reaction_type.value, post_id),
+        PENDING_REACTIONS_KEY,
+        loaded_key(post_id),
+        rev_key(post_id),
+        REACTIONS_REV_KEY
+    ]
+    args = [user_id, "add" if active else "remove", change, settings.reaction_cache_ttl, counter_seed()]
+
+    if await _SET_REACTION(keys=keys, args=args) == -1:
+        await load_reactions([post_id])
+        await _SET_REACTION(keys=keys, args=args)
+
+    return (await get_reactions([post_id], user_id))[post_id]
+
+async def drop_reactions(post_id: int):
+    """Remove a deleted post's reaction keys"""
+    await redis_client.delete(
+        *[reaction_key(reaction_type, post_id) for reaction_type in REACTION_TYPES],
+        loaded_key(post_id),
+        rev_key(post_id)
+    )
+
+async def reactions_version(post_id: Optional[int] = None) -> str:
+    """Changes whenever the post's reactions (or, without a post, any reactions) change"""
+    return await counter_version(rev_key(post_id) if post_id is not None else REACTIONS_REV_KEY)
+
+async def sync_reactions_to_db() -> dict:
+    """Write queued reaction changes to the reactions table in batches.
+
+    The pending list is drained atomically with RENAME; each batch is
+    collapsed to the last change per (user, post, type), applied through
+    the apply_reactions RPC and trimmed only once it is committed.
+    """
+    started = time.perf_counter()
+    report = {"changes": 0, "batches": 0, "elapsed_ms": 0.0}
+
+    # Only one worker flushes at a time
+    lock = await acquire_lock(REACTION_SYNC_LOCK_KEY, settings.reaction_sync_lock_ttl)
+    if lock is None:
+        return report
+
+    try:
+        if not await redis_client.exists(DRAINING_REACTIONS_KEY):
+            try:
+                await redis_client.rename(PENDING_REACTIONS_KEY, DRAINING_REACTIONS_KEY)
+            except ResponseError:
+                # No pending changes
+                pass
+
+        while True:
+            batch = await redis_client.lrange(DRAINING_REACTIONS_KEY, 0, settings.reaction_sync_batch_size - 1)
+            if not batch:
+                break
+
+            latest = {}
+            for raw in batch:
+                change = json.loads(raw)
+                latest[(change["user_id"], change["post_id"], change["type"])] = change
+            await sb_client.rpc("apply_reactions", {"payload": list(latest.values())}).execute()
+            await redis_client.ltrim(DRAINING_REACTIONS_KEY, len(batch), -1)
+
+            report["changes"] += len(latest)
+            report["batches"] += 1
+    finally:
+        await release_lock(REACTION_SYNC_LOCK_KEY, lock)
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    return report
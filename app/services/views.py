@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi import Request
+
+from app.config import settings
+from app.database.redis import redis_client
+
+# Pending view counts, drained into posts.views by post.sync_views_to_db
+PENDING_VIEWS_KEY = "post_views"
+# "{post_id}:{day}" members whose unique-visitor HLL changed since the last sync
+DIRTY_UNIQUE_VIEWS_KEY = "post_uv:dirty"
+
+
+def unique_views_key(post_id, day: str) -> str:
+    """HyperLogLog of visitor identities for one post on one UTC day"""
+    return f"post_uv:{post_id}:{day}"
+
+
+def visitor_identity(request: Request, user_id: Optional[str] = None) -> Optional[str]:
+    """Stable visitor key: the user id, or a hash of client IP and user agent"""
+    if not settings.unique_views_enabled:
+        return None
+    if user_id:
+        return f"u:{user_id}"
+    host = request.client.host if request.client else ""
+    agent = request.headers.get("user-agent", "")
+    return "a:" + hashlib.sha256(f"{host}|{agent}".encode()).hexdigest()[:32]
+
+
+class ViewAggregator:
+    """Per-worker buffer of view increments.
+
+    Page views only touch an in-memory Counter; the buffer is written to
+    Redis in one pipelined batch every ``flush_interval_ms`` or as soon as
+    ``max_pending`` events have accumulated, whichever comes first. Visitor
+    identities, when given, are added to the per-day HyperLogLogs in the
+    same batch.
+    """
+
+    def __init__(self, flush_interval_ms: int, max_pending: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._pending: Counter = Counter()
+        self._visitors: Dict[Tuple[int, str], Set[str]] = defaultdict(set)
+        self._events = 0
+        self._loop_task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failed_flushes = 0
+
+    def record(self, post_id: int, visitor: Optional[str] = None):
+        self._pending[post_id] += 1
+        self._events += 1
+        if visitor:
+            self._visitors[(post_id, datetime.utcnow().strftime("%Y%m%d"))].add(visitor)
+        if self._events >= self.max_pending and (self._flush_task is None or self._flush_task.done()):
+            # Flush in the background; the request never waits on Redis
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, visitors, events = self._pending, self._visitors, self._events
+            self._pending, self._visitors, self._events = Counter(), defaultdict(set), 0
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for post_id, count in pending.items():
+                        pipe.zincrby(PENDING_VIEWS_KEY, count, post_id)
+                    for (post_id, day), identities in visitors.items():
+                        key = unique_views_key(post_id, day)
+                        pipe.pfadd(key, *identities)
+                        pipe.expire(key, settings.unique_views_retention_days * 86400)
+                        pipe.sadd(DIRTY_UNIQUE_VIEWS_KEY, f"{post_id}:{day}")
+                    await pipe.execute()
+            except Exception as e:
+                # Keep the counts for the next attempt
+                self._pending.update(pending)
+                for key, identities in visitors.items():
+                    self._visitors[key].update(identities)
+                self._events += events
+                self.failed_flushes += 1
+                print(f"Error flushing views: {str(e)}")
+                return
+            self.flushes += 1
+            self.flushed_events += events
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_events": self._events,
+            "pending_posts": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+            "failed_flushes": self.failed_flushes
+        }
+
+
+view_aggregator = ViewAggregator(
+    settings.view_flush_interval_ms,
+    settings.view_flush_max_pending
+)
@@ -0,0 +1,110 @@
+"""Precompressed JSON documents with a per-request tail.
+
+A cached document is compressed once, without its closing brace, and the
+stream is flushed to a byte boundary. Serving it only appends the small
+per-request remainder (spliced-in fields and the brace) as an uncompressed
+block and closes the stream, so no compression runs on the request path:
+
+- gzip: sync-flushed deflate, then a stored block and the CRC-32/size
+  trailer (the CRC is continued from the one kept for the prefix)
+- br: flushed brotli stream, then an uncompressed meta-block and an empty
+  last meta-block
+"""
+import base64
+import struct
+import zlib
+from typing import Dict, Iterable, Optional
+
+import brotli
+
+# Preferred first
+ENCODINGS = ("br", "gzip")
+
+# Fixed header: no name, mtime 0, unknown OS
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+# Largest stored (deflate) / uncompressed (brotli) block
+_MAX_BLOCK = 65535
+
+
+def compress_prefix(
+    prefix: bytes,
+    gzip_level: int = 9,
+    brotli_quality: int = 9,
+    encodings: Iterable[str] = ENCODINGS
+) -> Dict[str, bytes]:
+    """The given encodings (by default all) of a document prefix, ready for ``complete``"""
+    variants = {}
+    if "gzip" in encodings:
+        deflate = zlib.compressobj(gzip_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        gzip = deflate.compress(prefix) + deflate.flush(zlib.Z_SYNC_FLUSH)
+        # The trailer needs the CRC-32 and size of everything before the tail
+        variants["gzip"] = struct.pack("<II", zlib.crc32(prefix), len(prefix) & 0xFFFFFFFF) + _GZIP_HEADER + gzip
+
+    if "br" in encodings:
+        compressor = brotli.Compressor(quality=brotli_quality)
+        variants["br"] = compressor.process(prefix) + compressor.flush()
+    return variants
+
+
+def complete(encoding: str, compressed_prefix: bytes, tail: bytes) -> bytes:
+    """Close a compressed prefix with an uncompressed tail"""
+    blocks = [tail[start:start + _MAX_BLOCK] for start in range(0, len(tail), _MAX_BLOCK)]
+
+    if encoding == "gzip":
+        crc, size = struct.unpack_from("<II", compressed_prefix)
+        chunks = [compressed_prefix[8:]]
+        for i, block in enumerate(blocks or [b""]):
+            # BFINAL on the last one, BTYPE=00 (stored), LEN, NLEN
+            final = i == max(len(blocks) - 1, 0)
+            chunks.append(struct.pack("<BHH", final, len(block), len(block) ^ 0xFFFF) + block)
+        chunks.append(struct.pack("<II", zlib.crc32(tail, crc), (size + len(tail)) & 0xFFFFFFFF))
+        return b"".join(chunks)
+
+    if encoding == "br":
+        chunks = [compressed_prefix]
+        for block in blocks:
+            # ISLAST=0, MNIBBLES=4, MLEN-1, ISUNCOMPRESSED=1, padded to a byte
+            header = ((len(block) - 1) << 3) | (1 << 19)
+            chunks.append(header.to_bytes(3, "little") + block)
+        # ISLAST=1, ISLASTEMPTY=1
+        chunks.append(b"\x03")
+        return b"".join(chunks)
+
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """The preferred supported encoding the client accepts, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = quality
+
+    best = None
+    for encoding in ENCODINGS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def pack(variants: Dict[str, bytes]) -> str:
+    """Variants as text for the string-decoding Redis client, one per line"""
+    return "\n".join(f"{name}:{base64.b64encode(data).decode()}" for name, data in variants.items())
+
+
+def unpack(text: str) -> Dict[str, bytes]:
+    variants = {}
+    for line in text.splitlines():
+        name, _, data = line.partition(":")
+        variants[name] = base64.b64decode(data)
+    return variants
@@ -0,0 +1,27 @@
+"""Opaque keyset cursors shared by the paginated listings."""
+import base64
+import json
+from typing import Any, Callable, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values: Any) -> str:
+    """URL-safe cursor for the key of the last row of a page"""
+    raw = json.dumps(list(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> Tuple[Any, ...]:
+    """The values of an ``encode_cursor`` cursor, each cast by the matching type.
+
+    Anything that does not decode to exactly that many values is rejected with a 400.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Wrong number of cursor values")
+        return tuple(cast(value) for cast, value in zip(types, values))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
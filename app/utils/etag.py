@@ -0,0 +1,56 @@
+import hashlib
+import secrets
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from app.database.redis import redis_client
+
+# Revision counters start from a random value rather than 0, so a counter
+# that Redis evicted or lost never repeats a number already sent in an ETag.
+# Scripts that INCR one seed it the same way: SET key <counter_seed()> NX.
+_COUNTER_VERSION = redis_client.register_script("""
+redis.call('SET', KEYS[1], ARGV[1], 'NX')
+return redis.call('GET', KEYS[1])
+""")
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the version parts that determine a response body"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def counter_seed() -> int:
+    return secrets.randbits(62)
+
+
+async def counter_version(key: str) -> str:
+    """Current value of a revision counter, seeding it if missing"""
+    return await _COUNTER_VERSION(keys=[key], args=[counter_seed()])
+
+
+def content_version(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def cache_headers(etag: str, cache_control: str, user_id: Optional[str] = None) -> dict:
+    # Bodies with viewer flags must not be shared by intermediaries
+    if user_id:
+        cache_control = cache_control.replace("public", "private")
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
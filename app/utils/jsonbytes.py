@@ -0,0 +1,46 @@
+"""Building JSON response bodies from pre-serialized documents.
+
+Cached documents are stored as the final, already-validated JSON bytes of a
+response object. Per-request fields are spliced into them and pages are
+joined as bytes, so a cache hit is never parsed, re-validated or
+re-encoded.
+"""
+from typing import Any, Iterable, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def dumps(value: Any) -> bytes:
+    """orjson with pydantic model support"""
+    return orjson.dumps(value, default=_default)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def document(model: BaseModel, exclude: Optional[set] = None, include: Optional[set] = None) -> bytes:
+    """Validated response model -> cacheable JSON bytes"""
+    return dumps(model.model_dump(exclude=exclude, include=include))
+
+
+def merge(doc: bytes, fields: Optional[dict] = None) -> bytes:
+    """Add fields to a serialized JSON object without parsing it"""
+    if not fields:
+        return doc
+    extra = dumps(fields)
+    if doc == b"{}":
+        return extra
+    return doc[:-1] + b"," + extra[1:]
+
+
+def array(docs: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(docs) + b"]"
+
+
+def json_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
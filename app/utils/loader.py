@@ -0,0 +1,101 @@
+import asyncio
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+# Resolves a list of distinct keys in one call; missing keys map to None
+BatchFunction = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+# Loaders of the current request, keyed by batch function
+_request_loaders: ContextVar[Optional[Dict[BatchFunction, "DataLoader"]]] = ContextVar(
+    "request_loaders", default=None
+)
+
+
+class DataLoader:
+    """Batches and memoizes keyed lookups.
+
+    Keys requested in the same event-loop tick, including from concurrent
+    coroutines, are collected and resolved with one call to the batch
+    function. Every key is looked up at most once per loader.
+    """
+
+    def __init__(self, batch_fn: BatchFunction):
+        self._batch_fn = batch_fn
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        # The event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(self._schedule)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        futures = {key: self.load(key) for key in keys}
+        await asyncio.gather(*futures.values())
+        return {key: future.result() for key, future in futures.items()}
+
+    def _schedule(self):
+        task = asyncio.ensure_future(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        self.batches += 1
+        try:
+            results = await self._batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # Not memoized, so a later load retries
+                self._futures.pop(key).set_exception(e)
+            return
+        for key in keys:
+            self._futures[key].set_result(results.get(key))
+
+
+def start_request_scope() -> Token:
+    return _request_loaders.set({})
+
+
+def end_request_scope(token: Token):
+    _request_loaders.reset(token)
+
+
+class RequestScopeMiddleware:
+    """Plain ASGI middleware giving each HTTP request its own loaders.
+
+    Runs the app in the request's own task (unlike ``@app.middleware``),
+    so the scope reaches the endpoint without an extra task hop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = start_request_scope()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end_request_scope(token)
+
+
+def request_loader(batch_fn: BatchFunction) -> DataLoader:
+    """The current request's loader for ``batch_fn``; a fresh one outside a request"""
+    loaders = _request_loaders.get()
+    if loaders is None:
+        return DataLoader(batch_fn)
+    loader = loaders.get(batch_fn)
+    if loader is None:
+        loader = loaders[batch_fn] = DataLoader(batch_fn)
+    return loader
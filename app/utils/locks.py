@@ -0,0 +1,26 @@
+"""Single-holder Redis locks for periodic jobs shared by all workers."""
+import uuid
+from typing import Optional
+
+from app.database.redis import redis_client
+
+# Delete the lock only while it still holds our token; once it has expired
+# and another worker has taken it, releasing must not free theirs
+_RELEASE = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+async def acquire_lock(key: str, ttl: int) -> Optional[str]:
+    """Token for release_lock, or None if another worker holds the lock"""
+    token = uuid.uuid4().hex
+    if await redis_client.set(key, token, nx=True, ex=ttl):
+        return token
+    return None
+
+
+async def release_lock(key: str, token: str) -> bool:
+    return bool(await _RELEASE(keys=[key], args=[token]))
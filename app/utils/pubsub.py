@@ -1,4 +1,270 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+from app.config import settings
 from app.database.redis import redis_client
 
 async def publish(channel: str, message: str):
-    await redis_client.publish(channel, message)
\ No newline at end of file
+    await redis_client.publish(channel, message)
+
+
+def stream_key(channel: str) -> str:
+    """Capped Redis Stream holding the recent events of a channel"""
+    return f"{channel}:events"
+
+
+# XADD and PUBLISH in one step so live order always matches stream order.
+# The pub/sub message wraps the payload as {"event_id": ..., "data": ...}.
+_PUBLISH_EVENT = redis_client.register_script("""
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'data', ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', ARGV[4], '{"event_id":"' .. id .. '","data":' .. ARGV[1] .. '}')
+return id
+""")
+
+
+async def publish_event(channel: str, message: str) -> str:
+    """Append a JSON message to the channel's stream and publish it live; returns the event id"""
+    return await _PUBLISH_EVENT(
+        keys=[stream_key(channel)],
+        args=[message, settings.event_stream_max_len, settings.event_stream_ttl * 1000, channel]
+    )
+
+
+def parse_event_id(event_id: str) -> Tuple[int, int]:
+    milliseconds, _, sequence = event_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+async def replay_events(channel: str, last_event_id: str) -> Optional[List[Tuple[str, Any]]]:
+    """Events published on ``channel`` after ``last_event_id``, oldest first.
+
+    Returns None when the stream no longer reaches back to ``last_event_id``
+    (trimmed or expired), in which case the client has to resync in full.
+    """
+    try:
+        last = parse_event_id(last_event_id)
+    except ValueError:
+        return None
+
+    key = stream_key(channel)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.xrange(key, "-", "+", count=1)
+        pipe.xrange(key, f"({last_event_id}", "+")
+        first, entries = await pipe.execute()
+
+    if not first:
+        # The stream expires after event_stream_ttl of silence
+        expired_before = (time.time() - settings.event_stream_ttl) * 1000
+        return [] if last[0] >= expired_before else None
+    if parse_event_id(first[0][0]) > last:
+        return None
+    return [(event_id, json.loads(fields["data"])) for event_id, fields in entries]
+
+
+class OutboundMessage(NamedTuple):
+    # Messages with the same key may be coalesced for slow consumers
+    key: Optional[Hashable]
+    text: str
+    # Stream id for messages sent with publish_event
+    event_id: Optional[str] = None
+
+
+# Turns (event id, decoded channel message) into (coalescing key, payload to send)
+Formatter = Callable[[Optional[str], Any], Tuple[Optional[Hashable], Any]]
+
+
+def _identity(event_id: Optional[str], data: Any) -> Tuple[Optional[Hashable], Any]:
+    return None, data
+
+
+class SlowConsumer(Exception):
+    """Raised to a consumer that fell past its high-water mark under the disconnect policy"""
+
+
+class Subscription:
+    """One local consumer of a channel, fed through a bounded queue.
+
+    When the queue reaches its high-water mark the policy decides what
+    happens to the next message: ``drop_oldest`` discards the oldest queued
+    message, ``coalesce`` replaces the newest queued message with the same key (and
+    otherwise drops the oldest), ``disconnect`` flags the consumer so it
+    can be closed.
+    """
+
+    def __init__(self, hub: "SubscriptionHub", channel: str, high_water: int, policy: str):
+        self.hub = hub
+        self.channel = channel
+        self.high_water = high_water
+        self.policy = policy
+        self.overflowed = False
+        # Live events at or before this stream id were already replayed
+        self.resume_after: Optional[Tuple[int, int]] = None
+        self._queue: Deque[OutboundMessage] = deque()
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, message: OutboundMessage):
+        if self.overflowed:
+            return
+        if len(self._queue) >= self.high_water:
+            if self.policy == "disconnect":
+                self.overflowed = True
+                self._queue.clear()
+                self.hub.disconnects += 1
+                self._ready.set()
+                return
+            if self.policy == "coalesce" and message.key is not None:
+                # Replace the newest queued message for the key so it stays the last one sent
+                for index in range(len(self._queue) - 1, -1, -1):
+                    if self._queue[index].key == message.key:
+                        self._queue[index] = message
+                        self.hub.coalesced += 1
+                        return
+            self._queue.popleft()
+            self.hub.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    async def get(self) -> OutboundMessage:
+        while True:
+            while not self._queue:
+                if self.overflowed:
+                    raise SlowConsumer(self.channel)
+                self._ready.clear()
+                await self._ready.wait()
+            message = self._queue.popleft()
+            if (
+                self.resume_after is not None
+                and message.event_id is not None
+                and parse_event_id(message.event_id) <= self.resume_after
+            ):
+                continue
+            return message
+
+
+class SubscriptionHub:
+    """Process-wide Redis pub/sub multiplexer.
+
+    Keeps a single pub/sub connection per worker, subscribes to a channel
+    when its first local consumer arrives and unsubscribes when the last
+    one leaves. Each message is decoded, formatted and serialized once and
+    the resulting text is fanned out to every local subscription.
+    """
+
+    def __init__(self):
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._formatters: Dict[str, Formatter] = {}
+        self._lock = asyncio.Lock()
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.disconnects = 0
+        self.sends = 0
+        self.send_seconds = 0.0
+        self.max_send_seconds = 0.0
+
+    async def subscribe(self, channel: str, formatter: Optional[Formatter] = None) -> Subscription:
+        subscription = Subscription(self, channel, settings.ws_queue_high_water, settings.ws_slow_consumer_policy)
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = redis_client.pubsub()
+            subscribers = self._subscriptions.setdefault(channel, set())
+            if not subscribers:
+                self._formatters[channel] = formatter or _identity
+                await self._pubsub.subscribe(channel)
+            subscribers.add(subscription)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        async with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[subscription.channel]
+                self._formatters.pop(subscription.channel, None)
+                await self._pubsub.unsubscribe(subscription.channel)
+
+    def record_send(self, seconds: float):
+        self.sends += 1
+        self.send_seconds += seconds
+        self.max_send_seconds = max(self.max_send_seconds, seconds)
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis-py reconnects and resubscribes on the next read
+                print(f"Pub/sub hub error: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+
+            channel = message["channel"]
+            subscribers = self._subscriptions.get(channel)
+            if not subscribers:
+                continue
+            self.received += 1
+            try:
+                data = json.loads(message["data"])
+                event_id = None
+                if isinstance(data, dict) and "event_id" in data:
+                    event_id, data = data["event_id"], data["data"]
+                key, payload = self._formatters[channel](event_id, data)
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            outbound = OutboundMessage(key, json.dumps(payload), event_id)
+            for subscription in list(subscribers):
+                subscription.put(outbound)
+            self.delivered += len(subscribers)
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscriptions.clear()
+        self._formatters.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [len(sub) for subs in self._subscriptions.values() for sub in subs]
+        return {
+            "channels": len(self._subscriptions),
+            "subscribers": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "received": self.received,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "slow_consumer_disconnects": self.disconnects,
+            "sends": self.sends,
+            "send_latency_avg_ms": round(self.send_seconds / self.sends * 1000, 3) if self.sends else 0.0,
+            "send_latency_max_ms": round(self.max_send_seconds * 1000, 3)
+        }
+
+
+hub = SubscriptionHub()
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Optional, Set
+
+from app.config import settings
+from app.database.redis import redis_client
+
+# jti -> token exp, so entries can be pruned once the token would have expired anyway
+REVOKED_TOKENS_KEY = "revoked_tokens"
+
+
+def _compact(jti: str) -> bytes:
+    # Our jtis are uuid4 hex; keep them as 16 raw bytes
+    try:
+        return bytes.fromhex(jti)
+    except ValueError:
+        return jti.encode()
+
+
+class RevocationList:
+    """Per-worker copy of the revoked token ids stored in Redis.
+
+    The "not revoked" answer, which is almost every request, is a set
+    lookup with no network call. The copy is refreshed from Redis every
+    ``token_revocation_sync_seconds``; the worker that revokes a token sees
+    it immediately.
+    """
+
+    def __init__(self):
+        self._revoked: Set[bytes] = set()
+        # Revoked here since the current sync started; a sync's Redis read
+        # may predate them, so they are merged into its result
+        self._revoked_since_sync: Set[bytes] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.synced_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and _compact(jti) in self._revoked
+
+    async def revoke(self, jti: str, expires_at: float):
+        await redis_client.zadd(REVOKED_TOKENS_KEY, {jti: expires_at})
+        self._revoked.add(_compact(jti))
+        self._revoked_since_sync.add(_compact(jti))
+
+    async def sync(self):
+        now = time.time()
+        self._revoked_since_sync = set()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+            pipe.zrange(REVOKED_TOKENS_KEY, 0, -1)
+            _, revoked = await pipe.execute()
+        self._revoked = {_compact(jti) for jti in revoked} | self._revoked_since_sync
+        self.synced_at = now
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"Error syncing revoked tokens: {str(e)}")
+            await asyncio.sleep(settings.token_revocation_sync_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revocation_list = RevocationList()
@@ -5,13 +5,34 @@ from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
-from app.database.supabase import sb_client  # Import directly
-from app.models.schemas import UserRole, UserResponse 
+from app.database.supabase import sb_client, AuthApiError  # Import directly
+from app.models.schemas import UserRole, UserResponse, TokenUser
+from app.services.cache import TwoTierCache, LocalCache
+from app.utils.revocation import revocation_list
 from typing import Optional
-from supabase import AuthApiError
+import hashlib
+import time
+import uuid
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# Same scheme for endpoints where authentication is optional
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
+
+# Authenticated user profiles, keyed by user id
+user_cache = TwoTierCache(
+    "user",
+    ttl=settings.user_cache_ttl,
+    loads=UserResponse.model_validate_json,
+    dumps=lambda user: user.model_dump_json()
+)
+
+# Verified tokens: sha256(token) -> claims, each entry living until the token's exp
+token_cache = LocalCache(
+    max_entries=settings.token_cache_size,
+    max_bytes=None,
+    ttl=settings.access_token_expire_minutes * 60
+)
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -28,7 +49,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(
         to_encode, 
         settings.jwt_secret, 
@@ -36,6 +57,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     )
     return encoded_jwt
 
+def token_claims(user_id: str, role: Optional[str] = None, username: Optional[str] = None) -> dict:
+    """Claims for a new access token; role and username are embedded only when enabled"""
+    claims = {"sub": user_id}
+    if settings.jwt_embed_claims and role is not None and username is not None:
+        claims.update({"role": role, "username": username})
+    return claims
+
 def get_user_role(supabase_role: str) -> UserRole:
     """Safely map Supabase role to UserRole enum with fallback"""
     try:
@@ -52,14 +80,14 @@ def get_user_role(supabase_role: str) -> UserRole:
 async def authenticate_user(email: str, password: str) -> Optional[UserResponse]:
     # Get user from Supabase Auth
     try:
-        auth_response = sb_client.auth.sign_in_with_password({
+        auth_response = await sb_client.auth.sign_in_with_password({
             "email": email,
             "password": password
         })
         
         if auth_response.user:
             # Get additional user data from profiles table
-            profile_data = sb_client.table("profiles") \
+            profile_data = await sb_client.table("profiles") \
                 .select("*") \
                 .eq("user_id", auth_response.user.id) \
                 .single() \
@@ -71,7 +99,7 @@ async def authenticate_user(email: str, password: str) -> Optional[UserResponse]
             return UserResponse(
                 id=auth_response.user.id,
                 email=auth_response.user.email,
-                role=get_user_role(auth_response.user.role or "authenticated"),
+                role=get_user_role(profile.get("role") or auth_response.user.role or "authenticated"),
                 created_at=auth_response.user.created_at,
                 username=profile.get("username", ""),
                 avatar_url=profile.get("avatar_url"),
@@ -85,6 +113,38 @@ async def authenticate_user(email: str, password: str) -> Optional[UserResponse]
         return None
     return None
 
+def decode_access_token(token: str) -> dict:
+    """Verify a bearer token and return its claims (raises JWTError).
+
+    Tokens are presented many times per session, so verified claims are
+    memoized by token digest until the token expires. Revocation is checked
+    on every call against the in-memory revocation list.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is None:
+        claims = jwt.decode(
+            token, 
+            settings.jwt_secret, 
+            algorithms=[settings.jwt_algorithm]
+        )
+        ttl = claims.get("exp", 0) - time.time()
+        if ttl > 0:
+            token_cache.set(digest, claims, ttl=ttl)
+    
+    if revocation_list.is_revoked(claims.get("jti")):
+        raise JWTError("Token has been revoked")
+    return claims
+
+async def get_optional_user_id(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[str]:
+    """User id from a valid bearer token, or None for anonymous requests"""
+    if not token:
+        return None
+    try:
+        return decode_access_token(token).get("sub")
+    except JWTError:
+        return None
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -92,20 +152,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, 
-            settings.jwt_secret, 
-            algorithms=[settings.jwt_algorithm]
-        )
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
+    # Check cache first
+    cached = await user_cache.get(user_id)
+    if cached:
+        return cached
+    
     # Get user from Supabase
+    load_token = await user_cache.begin_load(user_id)
     try:
-        user_data = sb_client.table("profiles") \
+        user_data = await sb_client.table("profiles") \
             .select("*") \
             .eq("user_id", user_id) \
             .single() \
@@ -115,7 +177,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
             raise credentials_exception
             
         # Create UserResponse from database data
-        return UserResponse(
+        user = UserResponse(
             id=user_id,
             email=user_data.data["email"],
             role=get_user_role(user_data.data.get("role", "reader")),
@@ -127,13 +189,43 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
     except Exception as e:
         print(f"Error fetching user: {str(e)}")
         raise credentials_exception
+    
+    # Never keep the profile past the token's own expiry
+    ttl = min(settings.user_cache_ttl, int(payload.get("exp", 0) - time.time()))
+    if ttl > 0:
+        await user_cache.set(user_id, user, ttl=ttl, token=load_token)
+    return user
+
+async def invalidate_cached_user(user_id: str):
+    """Drop a cached profile on every worker; call after profile or role changes"""
+    await user_cache.invalidate(user_id)
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> TokenUser:
+    """Identity and role for authorization checks.
+
+    When tokens carry signed role/username claims (JWT_EMBED_CLAIMS) this
+    costs no I/O at all; otherwise it falls back to the cached profile.
+    """
+    try:
+        claims = decode_access_token(token)
+    except JWTError:
+        claims = {}
+    if claims.get("sub") and "role" in claims and "username" in claims:
+        return TokenUser(
+            id=claims["sub"],
+            role=get_user_role(claims["role"]),
+            username=claims["username"]
+        )
+    
+    user = await get_current_user(token)
+    return TokenUser(id=user.id, role=user.role, username=user.username)
 
 async def get_current_active_user(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
     # Add your disabled user logic here if needed
     # For now, just return the user
     return current_user
 
-async def get_admin_user(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
+async def get_admin_user(current_user: TokenUser = Depends(get_current_principal)) -> TokenUser:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
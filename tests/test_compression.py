@@ -0,0 +1,76 @@
+import gzip
+import os
+import zlib
+
+import brotli
+import pytest
+
+from app.utils import compression
+
+TAIL_SIZES = [0, 1, 30, 65535, 65536, 200000]
+PREFIXES = {
+    "empty": b"",
+    "small": b'{"id":1,"title":"hello"',
+    "300kb": b'{"content":"' + os.urandom(100000).hex().encode() + b'x' * 100000 + b'"',
+}
+
+
+def _decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    return brotli.decompress(data)
+
+
+@pytest.mark.parametrize("encoding", compression.ENCODINGS)
+@pytest.mark.parametrize("prefix", PREFIXES.values(), ids=PREFIXES.keys())
+@pytest.mark.parametrize("tail_size", TAIL_SIZES)
+def test_complete_round_trip(encoding, prefix, tail_size):
+    tail = (b',"views":7}' * (tail_size // 11 + 1))[:tail_size]
+    variants = compression.compress_prefix(prefix)
+
+    assert _decompress(encoding, compression.complete(encoding, variants[encoding], tail)) == prefix + tail
+
+
+@pytest.mark.parametrize("tail_size", TAIL_SIZES)
+def test_gzip_stream_is_complete(tail_size):
+    tail = b"t" * tail_size
+    data = compression.complete("gzip", compression.compress_prefix(b'{"a":1', encodings=("gzip",))["gzip"], tail)
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decompressor.decompress(data) == b'{"a":1' + tail
+    assert decompressor.eof
+    assert decompressor.unused_data == b""
+
+
+def test_compress_prefix_only_requested_encodings():
+    assert set(compression.compress_prefix(b"{", encodings=("br",))) == {"br"}
+    assert set(compression.compress_prefix(b"{", encodings=("gzip",))) == {"gzip"}
+    assert set(compression.compress_prefix(b"{")) == set(compression.ENCODINGS)
+
+
+def test_complete_unsupported_encoding():
+    with pytest.raises(ValueError):
+        compression.complete("deflate", b"", b"}")
+
+
+def test_pack_round_trip():
+    variants = compression.compress_prefix(PREFIXES["300kb"])
+
+    assert compression.unpack(compression.pack(variants)) == variants
+    assert compression.unpack(compression.pack({})) == {}
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0.1, gzip;q=0.5", "gzip"),
+    ("GZIP;q=bad, gzip", "gzip"),
+])
+def test_negotiate(accept_encoding, expected):
+    assert compression.negotiate(accept_encoding) == expected
@@ -0,0 +1,19 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    cursor = encode_cursor("2024-01-01T00:00:00+00:00", 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, str, int) == ("2024-01-01T00:00:00+00:00", 42)
+    assert decode_cursor(encode_cursor(1792197492418, 2), int, int) == (1792197492418, 2)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(1), encode_cursor(1, 2, 3), encode_cursor("x", "y")])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, int, int)
+    assert error.value.status_code == 400